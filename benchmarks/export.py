@@ -0,0 +1,63 @@
+'''
+Export benchmark: generate rows in chunks, unload them and write compact columnar files.
+
+Usage:
+    python benchmarks/export.py [rows] [chunk] [npy|arrow] [directory]
+
+Prints the throughput and the peak resident set size of the process.
+'''
+import sys
+from resource import RUSAGE_SELF, getrusage
+from tempfile import mkdtemp
+
+from torch import cat, manual_seed, randint, randn
+
+from modugant.discriminators import SphereDiscriminator
+from modugant.generation import ArrowWriter, NpyWriter, compact
+from modugant.generators import SequentialGenerator
+from modugant.latents import NormalSource
+from modugant.loaders import ComposedLoader
+from modugant.loaders.connectors.categorical import CategoricalConnector
+from modugant.loaders.connectors.joint import JointConnector
+from modugant.loaders.connectors.standardize import StandardizeConnector
+from modugant.loaders.samplers.uniform import RandomSampler
+from modugant.matrix import Index
+from modugant.trainer import Trainer
+
+
+def main(rows: int, chunk: int, kind: str, directory: str) -> None:
+    '''Run the benchmark.'''
+    _ = manual_seed(0)
+    size = 100_000
+    data = cat([randint(0, 12, (size, 1)).float(), randn(size, 8)], dim = 1)
+    connector = JointConnector(
+        20,
+        12,
+        20,
+        [
+            CategoricalConnector(12, [(0, 12)]),
+            StandardizeConnector(data, Index(list(range(1, 9)), 8, 9))
+        ]
+    )
+    loader = ComposedLoader(data, RandomSampler(size), connector)
+    generator = SequentialGenerator(12, 16, 20, [128, 128], source = NormalSource(12, 16, chunk))
+    trainer = Trainer(generator, SphereDiscriminator(12, 20, [64]), loader)
+    names = ['category', *(f'x{i}' for i in range(8))]
+    dtypes = compact(9, {0: 12})
+    writer = (NpyWriter if kind == 'npy' else ArrowWriter)(directory, names, dtypes)
+    throughput = trainer.generate(rows, chunk = chunk, unload = True, writer = writer)
+    peak = getrusage(RUSAGE_SELF).ru_maxrss / 1024
+    print(
+        f'{kind}: {throughput.rows} rows in {throughput.seconds:.1f}s, {throughput.rate:,.0f} rows/s, '
+        f'peak RSS {peak:.0f} MiB'
+    )
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    main(
+        int(args[0]) if len(args) > 0 else 10_000_000,
+        int(args[1]) if len(args) > 1 else 65536,
+        args[2] if len(args) > 2 else 'npy',
+        args[3] if len(args) > 3 else mkdtemp()
+    )
@@ -0,0 +1,76 @@
+'''
+Program benchmark: latency of the exported TorchScript sampling program against the eager path.
+
+Usage:
+    python benchmarks/program.py [repeats] [path]
+
+Prints the median latency of drawing and decoding a batch, for a few batch sizes.
+'''
+import sys
+from statistics import median
+from tempfile import mkdtemp
+from time import perf_counter
+from typing import Callable
+
+from torch import cat, inference_mode, jit, manual_seed, randint, randn
+
+from modugant.conditions import EmpiricalConditions
+from modugant.discriminators import SphereDiscriminator
+from modugant.generators import ResidualGenerator
+from modugant.loaders import ComposedLoader
+from modugant.loaders.connectors.categorical import CategoricalConnector
+from modugant.loaders.connectors.joint import JointConnector
+from modugant.loaders.connectors.standardize import StandardizeConnector
+from modugant.loaders.samplers.uniform import RandomSampler
+from modugant.matrix import Index
+from modugant.trainer import Trainer
+
+
+def _latency(call: Callable[[], object], repeats: int) -> float:
+    '''Median seconds of a call, after one warm-up call.'''
+    _ = call()
+    times: list[float] = []
+    for _ in range(repeats):
+        start = perf_counter()
+        _ = call()
+        times.append(perf_counter() - start)
+    return median(times)
+
+
+def main(repeats: int, path: str) -> None:
+    '''Run the benchmark.'''
+    _ = manual_seed(0)
+    size = 100_000
+    data = cat([randint(0, 12, (size, 1)).float(), randn(size, 8)], dim = 1)
+    connector = JointConnector(
+        20,
+        12,
+        20,
+        [
+            CategoricalConnector(12, [(0, 12)]),
+            StandardizeConnector(data, Index(list(range(1, 9)), 8, 9))
+        ]
+    )
+    loader = ComposedLoader(data, RandomSampler(size), connector)
+    generator = ResidualGenerator(12, 16, 20, [128, 128])
+    trainer = Trainer(generator, SphereDiscriminator(12, 20, [64]), loader)
+    conditions = EmpiricalConditions.fit(loader)
+    trainer.export(path, conditions)
+    program = jit.load(path)
+    _ = generator.train(False)
+    for batch in (1, 64, 4096, 65536):
+        with inference_mode():
+            eager = _latency(lambda: connector.unload(trainer.sample(batch, conditions)), repeats)
+            exported = _latency(lambda: program(batch), repeats)
+        print(
+            f'{batch:>6} rows: eager {eager * 1e3:8.3f} ms, program {exported * 1e3:8.3f} ms, '
+            f'{eager / exported:.1f}x'
+        )
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    main(
+        int(args[0]) if len(args) > 0 else 50,
+        args[1] if len(args) > 1 else f'{mkdtemp()}/program.pt'
+    )
@@ -0,0 +1,100 @@
+'''
+Server load test: concurrent clients requesting rows from the batching server over localhost.
+
+Usage:
+    python benchmarks/server.py [clients] [requests] [count] [window] [batch]
+
+Prints the p50 and p99 request latency, to the last byte, and the rows per second served.
+'''
+import json
+import sys
+from asyncio import gather, open_connection, run
+from statistics import quantiles
+from time import perf_counter
+
+from torch import cat, manual_seed, randint, randn
+
+from modugant.conditions import EmpiricalConditions
+from modugant.generators import ResidualGenerator
+from modugant.loaders import ComposedLoader
+from modugant.loaders.connectors.categorical import CategoricalConnector
+from modugant.loaders.connectors.joint import JointConnector
+from modugant.loaders.connectors.standardize import StandardizeConnector
+from modugant.loaders.samplers.uniform import RandomSampler
+from modugant.matrix import Index
+from modugant.pipeline import Pipeline
+from modugant.server import BatchingServer
+
+
+async def _request(port: int, condition: list[float], count: int) -> int:
+    '''Request rows and read the chunked response, returning the number of bytes of rows.'''
+    (reader, writer) = await open_connection('127.0.0.1', port)
+    body = json.dumps({'condition': condition, 'count': count}).encode()
+    writer.write(f'POST /sample HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n\r\n'.encode() + body)
+    await writer.drain()
+    if not (await reader.readline()).startswith(b'HTTP/1.1 200'):
+        raise RuntimeError('The request failed.')
+    while (await reader.readline()).strip():
+        pass
+    received = 0
+    while (size := int((await reader.readline()).strip(), 16)) > 0:
+        received += len(await reader.readexactly(size + 2)) - 2
+    writer.close()
+    return received
+
+
+async def _client(port: int, conditions: list[list[float]], count: int, latencies: list[float]) -> None:
+    '''Issue requests one after the other.'''
+    for condition in conditions:
+        start = perf_counter()
+        _ = await _request(port, condition, count)
+        latencies.append(perf_counter() - start)
+
+
+async def _main(clients: int, requests: int, count: int, window: float, batch: int) -> None:
+    _ = manual_seed(0)
+    size = 100_000
+    data = cat([randint(0, 12, (size, 1)).float(), randn(size, 8)], dim = 1)
+    connector = JointConnector(
+        20,
+        12,
+        20,
+        [
+            CategoricalConnector(12, [(0, 12)]),
+            StandardizeConnector(data, Index(list(range(1, 9)), 8, 9))
+        ]
+    )
+    loader = ComposedLoader(data, RandomSampler(size), connector)
+    generator = ResidualGenerator(12, 16, 20, [128, 128]).train(False)
+    conditions = EmpiricalConditions.fit(loader, 65536)
+    server = BatchingServer(Pipeline(generator, connector, conditions), batch = batch, window = window)
+    port = await server.start()
+    latencies: list[float] = []
+    drawn = conditions.sample(clients * requests).tolist()
+    start = perf_counter()
+    _ = await gather(*(
+        _client(port, drawn[i * requests:(i + 1) * requests], count, latencies) for i in range(clients)
+    ))
+    seconds = perf_counter() - start
+    await server.close()
+    cuts = quantiles(latencies, n = 100)
+    print(
+        f'{clients} clients x {requests} requests x {count} rows, batch {batch}, window {window * 1e3:.1f} ms: '
+        f'p50 {cuts[49] * 1e3:.2f} ms, p99 {cuts[98] * 1e3:.2f} ms, {clients * requests * count / seconds:,.0f} rows/s'
+    )
+
+
+def main(clients: int, requests: int, count: int, window: float, batch: int) -> None:
+    '''Run the load test.'''
+    run(_main(clients, requests, count, window, batch))
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    main(
+        int(args[0]) if len(args) > 0 else 32,
+        int(args[1]) if len(args) > 1 else 50,
+        int(args[2]) if len(args) > 2 else 100,
+        float(args[3]) if len(args) > 3 else 0.005,
+        int(args[4]) if len(args) > 4 else 65536
+    )
@@ -1,4 +1,8 @@
 '''GAN model package.'''
-from .trainer import Connector, Discriminator, Generator, Regimen, Trainer
+from .distiller import Distiller
+from .ensemble import Ensemble
+from .loaders.connectors.protocol import Connector
+from .server import BatchingServer
+from .trainer import Discriminator, Generator, Regimen, Trainer
 
-__all__ = ['Connector', 'Discriminator', 'Generator', 'Regimen', 'Trainer']
+__all__ = ['BatchingServer', 'Connector', 'Discriminator', 'Distiller', 'Ensemble', 'Generator', 'Regimen', 'Trainer']
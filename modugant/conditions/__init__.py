@@ -0,0 +1,5 @@
+'''Condition sources for generation without the training data.'''
+from .empirical import EmpiricalConditions
+from .protocol import ConditionSource
+
+__all__ = ['ConditionSource', 'EmpiricalConditions']
@@ -0,0 +1,112 @@
+from typing import Self, override
+
+from torch import Tensor, cat, inference_mode, rand, randint, tensor, unique, where, zeros
+
+from modugant.conditions.protocol import ConditionSource
+from modugant.device import Device, check_device
+from modugant.loaders.protocol import Loader
+from modugant.matrix.matrix import Matrix
+
+
+def _alias(weights: list[float]) -> tuple[list[float], list[int]]:
+    '''Build a Vose alias table for a discrete distribution.'''
+    k = len(weights)
+    total = sum(weights)
+    scaled = [weight * k / total for weight in weights]
+    (prob, alias) = ([1.0] * k, list(range(k)))
+    small = [i for (i, p) in enumerate(scaled) if p < 1.0]
+    large = [i for (i, p) in enumerate(scaled) if p >= 1.0]
+    while small and large:
+        (less, more) = (small.pop(), large.pop())
+        (prob[less], alias[less]) = (scaled[less], more)
+        scaled[more] = scaled[more] + scaled[less] - 1.0
+        (small if scaled[more] < 1.0 else large).append(more)
+    return (prob, alias)
+
+
+class EmpiricalConditions[C: int](ConditionSource[C]):
+    '''
+    Empirical distribution of condition vectors.
+
+    The distinct condition rows are stored once with an alias table over their frequencies, so a draw
+    of any size costs two uniform draws and one gather, and the state grows with the number of
+    distinct conditions rather than with the data.
+    '''
+
+    def __init__(self, rows: Matrix[int, C], counts: Tensor) -> None:
+        '''
+        Initialize the distribution.
+
+        Args:
+            rows (Matrix[int, C]): The distinct condition rows.
+            counts (Tensor (K,)): The number of times each row was observed.
+
+        '''
+        assert len(rows) == len(counts) and len(rows) > 0, 'Every distinct row needs a count.'
+        (prob, alias) = _alias(counts.tolist())
+        self._conditions = rows.shape[1]
+        self._rows = rows
+        self._prob = tensor(prob, device = rows.device)
+        self._alias = tensor(alias, device = rows.device)
+    @staticmethod
+    def of[CS: int](conditions: Matrix[int, CS]) -> 'EmpiricalConditions[CS]':
+        '''
+        Fit the distribution to observed conditions.
+
+        Args:
+            conditions (Matrix[int, C]): The observed condition rows.
+
+        Returns:
+            EmpiricalConditions[C]: The fitted distribution.
+
+        '''
+        (rows, counts) = unique(conditions.detach(), dim = 0, return_counts = True)
+        return EmpiricalConditions(Matrix.cast(rows, (len(rows), conditions.shape[1])), counts)
+    @staticmethod
+    def fit[S: int, CS: int](
+        loader: Loader[S, CS, int],
+        draws: int = 1 << 20,
+        chunk: int = 65536
+    ) -> 'EmpiricalConditions[CS]':
+        '''
+        Fit the distribution to conditions drawn through a loader.
+
+        Args:
+            loader (Loader[S, C, D]): The loader, sampling rows and conditioning them as in training.
+            draws (int): The number of conditions drawn.
+            chunk (int): The number of conditions drawn at once.
+
+        Returns:
+            EmpiricalConditions[C]: The fitted distribution.
+
+        '''
+        (rows, counts) = ([], [])
+        with inference_mode():
+            for start in range(0, draws, chunk):
+                conditions = loader.condition(loader.sample(min(chunk, draws - start)))
+                (distinct, count) = unique(conditions, dim = 0, return_counts = True)
+                rows.append(distinct)
+                counts.append(count)
+            ## the distinct rows of every chunk are merged, adding up their counts
+            (merged, inverse) = unique(cat(rows), dim = 0, return_inverse = True)
+            total = zeros(len(merged), dtype = counts[0].dtype, device = merged.device)
+            _ = total.index_add_(0, inverse, cat(counts))
+        return EmpiricalConditions(Matrix.cast(merged.clone(), (len(merged), loader.conditions)), total.clone())
+    @override
+    def sample[N: int](self, batch: N) -> Matrix[N, C]:
+        pick = randint(len(self._rows), (batch,), device = self._rows.device)
+        keep = rand(batch, device = self._rows.device) < self._prob[pick]
+        return Matrix.cast(self._rows[where(keep, pick, self._alias[pick])], (batch, self._conditions))
+    @override
+    def move(self, device: Device) -> Self:
+        device = check_device(device)
+        (self._rows, self._prob, self._alias) = (self._rows.to(device), self._prob.to(device), self._alias.to(device))
+        return self
+    @property
+    def table(self) -> tuple[Matrix[int, C], Tensor, Tensor]:
+        '''The distinct condition rows, the probability of keeping a pick and the alias of every row.'''
+        return (self._rows, self._prob, self._alias)
+    @property
+    def size(self) -> int:
+        '''The number of distinct condition rows.'''
+        return len(self._rows)
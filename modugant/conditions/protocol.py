@@ -0,0 +1,46 @@
+from typing import Protocol, Self
+
+from modugant.device import Device
+from modugant.matrix.matrix import Matrix
+from modugant.protocols import WithConditions
+
+
+class ConditionSource[C: int](WithConditions[C], Protocol):
+    '''
+    Source of generator conditions that does not need the training data.
+
+    Type parameters:
+        C: The number of conditions.
+
+    Abstract methods (must be implemented in subclass):
+        sample: Draw conditions.
+            [N:int](batch: N) -> Matrix[N, C]
+        move: Move the source to a device.
+            (device: Device) -> Self
+
+    '''
+
+    def sample[N: int](self, batch: N) -> Matrix[N, C]:
+        '''
+        Draw conditions.
+
+        Args:
+            batch (N: int): The number of conditions.
+
+        Returns:
+            Matrix[N, C]: The conditions.
+
+        '''
+        ...
+    def move(self, device: Device) -> Self:
+        '''
+        Move the source to a device.
+
+        Args:
+            device (Device): The device.
+
+        Returns:
+            Self: The source.
+
+        '''
+        ...
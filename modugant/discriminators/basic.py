@@ -1,11 +1,14 @@
 from typing import Self, override
 
-from torch import Tensor, cat
+from torch import Tensor
 from torch.nn import Linear, Module
 from torch.optim import Optimizer
 
 from modugant.device import Device
 from modugant.discriminators.protocol import Discriminator
+from modugant.layers.interactive import InteractionLayer
+from modugant.layers.linear.linear import LinearLayer
+from modugant.layers.parts import forward_parts
 from modugant.matrix import Matrix
 from modugant.matrix.dim import Dim, One
 
@@ -54,7 +57,7 @@ class BasicDiscriminator[C: int, D: int](Module, Discriminator[C, D]):
     @override
     def predict[N: int](self, condition: Matrix[N, C], data: Matrix[N, D]) -> Matrix[N, One]:
         return Matrix.cast(
-            self.forward(cat([condition, data], dim = 1)),
+            forward_parts(self._model, (condition, data)),
             shape = (condition.shape[0], Dim.one())
         )
     @override
@@ -67,7 +70,7 @@ class BasicDiscriminator[C: int, D: int](Module, Discriminator[C, D]):
     @override
     def reset(self) -> None:
         for module in self.modules():
-            if isinstance(module, Linear):
+            if isinstance(module, (Linear, LinearLayer, InteractionLayer)):
                 module.reset_parameters()
     @override
     def move(self, device: Device) -> Self:
@@ -49,7 +49,8 @@ class FoldedDiscriminator[C: int, D: int](StandardDiscriminator[C, D], Reshaping
         lr: float = 0.1,
         betas: Tuple[float, float] = (0.5, 0.9),
         decay: float = 0.1,
-        slope: float = 0.1
+        slope: float = 0.1,
+        checkpoint: int = 0
     ) -> None:
         '''
         Initialize the discriminator model.
@@ -64,6 +65,7 @@ class FoldedDiscriminator[C: int, D: int](StandardDiscriminator[C, D], Reshaping
             betas (Tuple[float, float]): The beta values for the Adam optimizer.
             decay (float): The weight decay.
             slope (float): The slope of the LeakyReLU activation function.
+            checkpoint (int): The number of steps per recomputed segment; 0 disables checkpointing.
 
         '''
         super().__init__(
@@ -75,7 +77,8 @@ class FoldedDiscriminator[C: int, D: int](StandardDiscriminator[C, D], Reshaping
                 Index.range(ins),
                 [RectifiedLayer(outs), DropoutLayer(outs, dropout)]
             ),
-            finish = lambda ins: LinearLayer(Dim.one(), Index.range(ins))
+            finish = lambda ins: LinearLayer(Dim.one(), Index.range(ins)),
+            checkpoint = checkpoint
         )
         self.__group = group
         self.__lr = lr
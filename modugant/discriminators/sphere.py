@@ -8,6 +8,7 @@ from modugant.discriminators.standard import StandardDiscriminator
 from modugant.layers.isometric.dropout import DropoutLayer
 from modugant.layers.isometric.relu import RectifiedLayer
 from modugant.layers.linear.sphere import SphericalLayer
+from modugant.layers.parts import forward_parts
 from modugant.matrix import Matrix
 from modugant.matrix.dim import Dim, One
 from modugant.matrix.index import Index
@@ -26,6 +27,7 @@ class SphereDiscriminator[C: int, D: int](StandardDiscriminator[C, D], Reshaping
         lr: float = 0.001,
         betas: Tuple[float, float] = (0.5, 0.9),
         decay: float = 0.1,
+        checkpoint: int = 0
     ) -> None:
         '''
         Initialize the discriminator model.
@@ -38,6 +40,7 @@ class SphereDiscriminator[C: int, D: int](StandardDiscriminator[C, D], Reshaping
             lr (float): The learning rate.
             betas (Tuple[float, float]): The beta values for the Adam optimizer.
             decay (float): The weight decay.
+            checkpoint (int): The number of steps per recomputed segment; 0 disables checkpointing.
 
         '''
         super().__init__(
@@ -49,7 +52,8 @@ class SphereDiscriminator[C: int, D: int](StandardDiscriminator[C, D], Reshaping
                 Index.range(ins),
                 [RectifiedLayer(outs), DropoutLayer(outs, dropout)]
             ),
-            finish = lambda ins: SphericalLayer(Dim.one(), Index.range(ins))
+            finish = lambda ins: SphericalLayer(Dim.one(), Index.range(ins)),
+            checkpoint = checkpoint
         )
         self.__lr = lr
         self.__decay = decay
@@ -73,6 +77,10 @@ class SphereDiscriminator[C: int, D: int](StandardDiscriminator[C, D], Reshaping
     def unshape[N: int](self, data: Tensor, n: N) -> Matrix[N, One]:
         return Matrix.cast(data, (n, Dim.one()))
     @override
+    def predict[N: int](self, condition: Matrix[N, C], data: Matrix[N, D]) -> Matrix[N, One]:
+        ## the reshape is a plain concatenation, which the first layer can skip
+        return self.unshape(forward_parts(self._model, (condition, data)), data.shape[0])
+    @override
     def loss[N: int](self, condition: Matrix[N, C], data: Matrix[N, D], target: Matrix[N, One]) -> Matrix[One, One]:
         predicted = self.predict(condition, data)
         loss = - (target.t() @ predicted.log() + (1 - target.t()) @ (1 - predicted).log()) / len(target)
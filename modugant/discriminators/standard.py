@@ -1,8 +1,9 @@
 from typing import Callable
 
-from torch.nn import Module, Sequential
+from torch.nn import Module
 
 from modugant.discriminators.basic import BasicDiscriminator
+from modugant.layers.checkpoint import sequential
 
 
 class StandardDiscriminator[C: int, D: int](BasicDiscriminator[C, D]):
@@ -21,7 +22,8 @@ class StandardDiscriminator[C: int, D: int](BasicDiscriminator[C, D]):
         outputs: D,
         steps: list[int],
         layer: Callable[[int, int, int], Module],
-        finish: Callable[[int], Module]
+        finish: Callable[[int], Module],
+        checkpoint: int = 0
     ) -> None:
         '''
         Initialize the discriminator model.
@@ -35,10 +37,11 @@ class StandardDiscriminator[C: int, D: int](BasicDiscriminator[C, D]):
             finish (Callable[[int], nn.Module]): The final layer constructor.
                 (inputs) -> layer
             optimizer (Callable[[], Optimizer]): The optimizer constructor.
+            checkpoint (int): The number of steps per recomputed segment; 0 disables checkpointing.
 
         '''
         super().__init__(conditions, outputs)
-        self._model = Sequential(
+        self._model = sequential(
             *[
                 layer(
                     steps[i - 1] if i else outputs + conditions,
@@ -47,5 +50,6 @@ class StandardDiscriminator[C: int, D: int](BasicDiscriminator[C, D]):
                 )
                 for i in range(len(steps))
             ],
-            finish(steps[-1] if len(steps) else outputs + conditions)
+            finish(steps[-1] if len(steps) else outputs + conditions),
+            every = checkpoint
         )
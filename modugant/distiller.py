@@ -0,0 +1,172 @@
+'''
+Knowledge distillation of trained generators.
+
+Classes:
+    Distiller: Trainer fitting a compact student generator to a trained teacher.
+
+'''
+from typing import Any, Callable, Iterator, Optional, Tuple
+
+from torch import Tensor, device, inference_mode, manual_seed, no_grad
+from torch.nn import Module
+from torch.nn.functional import mse_loss
+from torch.random import fork_rng
+
+from modugant.device import Device, check_device
+from modugant.discriminators import Discriminator
+from modugant.generation import Fidelity, compare
+from modugant.generators import BasicGenerator
+from modugant.loaders import Loader
+from modugant.matrix import Dim, Matrix
+from modugant.matrix.ops import ones
+
+type DistillReporter = Callable[[int, float, float], None]
+
+
+def _freeze(value: Any) -> None:
+    '''Stop gradients into every module reachable from an object, such as a wrapping discriminator.'''
+    (seen, stack) = (set[int](), [value])
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        if isinstance(item, Module):
+            _ = item.requires_grad_(False)
+        elif isinstance(item, dict):
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+        elif hasattr(item, '__dict__'):
+            stack.extend(vars(item).values())
+
+
+class Distiller[R: int, C: int, L: int, D: int]:
+    '''
+    Trainer fitting a compact student generator to a trained teacher.
+
+    The student is trained to reproduce the output of the teacher on the same conditions and latent
+    inputs, optionally pushed further by the loss of a frozen discriminator on its intercepted output.
+    Conditions are drawn through the loader, as in training. The teacher and the discriminator are
+    frozen in place, so no gradient accumulates on them.
+
+    Type parameters:
+        R: The number of raw data inputs.
+        C: The number of conditions.
+        L: The number of latent inputs.
+        D: The number of data inputs.
+
+    '''
+
+    def __init__(
+        self,
+        teacher: BasicGenerator[C, L, D],
+        student: BasicGenerator[C, L, D],
+        loader: Loader[R, C, D],
+        discriminator: Optional[Discriminator[C, D]] = None,
+        adversarial: float = 0.0,
+        device: Device = 'cpu'
+    ) -> None:
+        '''
+        Initialize the distiller.
+
+        Args:
+            teacher (BasicGenerator): The trained generator, kept in evaluation mode.
+            student (BasicGenerator): The generator trained to match the teacher.
+            loader (Loader): The loader drawing conditions.
+            discriminator (Optional[Discriminator]): The frozen discriminator of the adversarial term.
+            adversarial (float): The weight of the adversarial term.
+            device (Device): The device to use.
+
+        '''
+        assert teacher.conditions == student.conditions and teacher.latents == student.latents, \
+            'The student must read the same conditions and latent inputs as the teacher.'
+        assert adversarial == 0.0 or discriminator is not None, 'An adversarial term needs a discriminator.'
+        self.__device = check_device(device)
+        self.__teacher = teacher.move(self.__device).train(False)
+        self.__student = student.move(self.__device)
+        self.__loader = loader.move(self.__device)
+        self.__discriminator = None if discriminator is None else discriminator.move(self.__device).train(False)
+        _freeze((self.__teacher, self.__discriminator))
+        self.__adversarial = adversarial
+    def step(self, batch: int) -> Iterator[Tuple[int, Tuple[float, float]]]:
+        '''
+        Step the student.
+
+        Args:
+            batch (int): The number of conditions per step.
+
+        Yields:
+            Tuple[int, Tuple[float, float]]: The step number, the matching loss and the adversarial loss.
+
+        '''
+        trues = ones((batch, Dim.one()), device = self.__device)
+        i = 0
+        with device(self.__device):
+            _ = self.__student.train(True)
+            while True:
+                condition = self.__loader.condition(self.__loader.sample(batch))
+                latent = self.__teacher.latent(condition)
+                with no_grad():
+                    target = self.__teacher.generate(condition, latent)
+                generated = self.__student.generate(condition, latent)
+                match = mse_loss(generated, target)
+                loss = match.reshape(1, 1)
+                adversarial = 0.0
+                if self.__discriminator is not None and self.__adversarial:
+                    data = self.__loader.intercept(condition, generated)
+                    d_loss = self.__discriminator.loss(condition, data, trues)
+                    loss = loss + self.__adversarial * d_loss
+                    adversarial = d_loss.item()
+                self.__student.update(Matrix.cast(loss, (Dim.one(), Dim.one())))
+                yield i, (match.item(), adversarial)
+                i += 1
+    def train(self, iterations: int, batch: int, report: Optional[DistillReporter] = None) -> None:
+        '''
+        Train the student.
+
+        Args:
+            iterations (int): The number of steps.
+            batch (int): The number of conditions per step.
+            report (Optional[Callable[[int, float, float], None]]): The report function, given the step
+                number, the matching loss and the adversarial loss.
+
+        '''
+        for i, (match, adversarial) in self.step(batch):
+            if report is not None:
+                report(i, match, adversarial)
+            if i + 1 >= iterations:
+                break
+        _ = self.__student.train(False)
+    def fidelity(self, n: int = 65536, seed: int = 0) -> Fidelity:
+        '''
+        Measure the gap between the raw output of the student and of the teacher.
+
+        Both generators sample the same conditions and latent inputs, and their outputs are intercepted
+        and unloaded from the same random state.
+
+        Args:
+            n (int): The number of rows compared.
+            seed (int): The seed of the shared random state.
+
+        Returns:
+            Fidelity: The largest gaps of the marginal and pairwise statistics.
+
+        '''
+        samples: list[Tensor] = []
+        mode = self.__student.training
+        _ = self.__student.train(False)
+        with device(self.__device), inference_mode(), fork_rng():
+            _ = manual_seed(seed)
+            condition = self.__loader.condition(self.__loader.sample(n))
+            latent = self.__teacher.latent(condition)
+            for generator in (self.__teacher, self.__student):
+                _ = manual_seed(seed)
+                generated = generator.generate(condition, latent)
+                samples.append(self.__loader.unload(self.__loader.intercept(condition, generated)))
+        _ = self.__student.train(mode)
+        return compare(samples[0], samples[1])
+    @property
+    def student(self) -> BasicGenerator[C, L, D]:
+        '''The student generator.'''
+        return self.__student
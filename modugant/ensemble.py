@@ -0,0 +1,354 @@
+'''
+Vectorized training of many GANs in one process.
+
+Classes:
+    Ensemble: Trainer for many structurally identical GANs sharing a loader.
+
+'''
+from copy import deepcopy
+from typing import Any, Callable, Iterator, Optional, Sequence, Tuple
+
+from torch import Tensor, device, no_grad, ones, sqrt, tensor, where, zeros, zeros_like
+from torch import bool as torch_bool
+from torch import cat as tcat
+from torch import stack as tstack
+from torch.autograd import grad
+from torch.func import functional_call, stack_module_state, vmap
+from torch.nn import Module
+from torch.optim import Adam, Optimizer
+
+from modugant.device import Device, check_device
+from modugant.discriminators.basic import BasicDiscriminator
+from modugant.generators.base import BasicGenerator
+from modugant.layers.checkpoint import CheckpointedSequential
+from modugant.layers.interactive import InteractionLayer
+from modugant.layers.linear.sphere import SphericalLayer
+from modugant.loaders import Loader
+from modugant.matrix import BatchedMatrix, Dim, Matrix
+from modugant.matrix.ops import cat
+from modugant.regimens import Action, Regimen
+
+type State = Tuple[dict[str, Tensor], dict[str, Tensor]]
+type EnsembleReporter = Callable[[int, int, Action, str, float, float], None]
+
+
+class _Call(Module):
+    '''Expose a method of a module as the forward pass, so it can run on functional state.'''
+
+    def __init__(self, module: Module, method: str) -> None:
+        super().__init__()
+        self.module = module
+        self._method = method
+    def forward(self, *args: Any) -> Any:
+        return getattr(self.module, self._method)(*args)
+
+
+class _Stack:
+    '''The stacked state of structurally identical modules and a batched Adam over their parameters.'''
+
+    def __init__(self, members: Sequence[Module], optimizers: Sequence[Optimizer]) -> None:
+        shapes = [
+            (type(member), [(name, tensor.shape) for (name, tensor) in member.state_dict().items()])
+            for member in members
+        ]
+        assert all(shape == shapes[0] for shape in shapes), 'An ensemble needs structurally identical members.'
+        assert all(type(optimizer) is Adam for optimizer in optimizers), 'An ensemble only batches Adam optimizers.'
+        (params, buffers) = stack_module_state(list(members))
+        self.members = members
+        self.params = {f'module.{name}': param for (name, param) in params.items()}
+        self.buffers = {f'module.{name}': buffer for (name, buffer) in buffers.items()}
+        groups = [optimizer.param_groups[0] for optimizer in optimizers]
+        like = next(iter(self.params.values()))
+        (self._lr, self._beta1, self._beta2, self._eps, self._decay) = (
+            tensor(values, dtype = like.dtype, device = like.device)
+            for values in (
+                [group['lr'] for group in groups],
+                [group['betas'][0] for group in groups],
+                [group['betas'][1] for group in groups],
+                [group['eps'] for group in groups],
+                [group['weight_decay'] for group in groups]
+            )
+        )
+        self._steps = zeros(len(members), dtype = like.dtype, device = like.device)
+        self._avg = {name: zeros_like(param) for (name, param) in self.params.items()}
+        self._sq = {name: zeros_like(param) for (name, param) in self.params.items()}
+    def state(self, detach: bool = False) -> State:
+        '''Return the functional state, detached from the parameters if their gradients are not needed.'''
+        if detach:
+            return ({name: param.detach() for (name, param) in self.params.items()}, self.buffers)
+        return (self.params, self.buffers)
+    def step(self, loss: Tensor, active: Tensor) -> None:
+        '''Take one Adam step on the parameters of every active member.'''
+        grads = grad(loss, list(self.params.values()))
+        with no_grad():
+            self._steps.add_(active.to(self._steps.dtype))
+            steps = self._steps.clamp(min = 1)
+            (first, second) = (1 - self._beta1 ** steps, 1 - self._beta2 ** steps)
+            for ((name, param), gradient) in zip(self.params.items(), grads):
+                shape = (-1,) + (1,) * (param.dim() - 1)
+                keep = active.view(shape)
+                gradient = gradient + self._decay.view(shape) * param
+                beta1 = self._beta1.view(shape)
+                beta2 = self._beta2.view(shape)
+                avg = where(keep, beta1 * self._avg[name] + (1 - beta1) * gradient, self._avg[name])
+                sq = where(keep, beta2 * self._sq[name] + (1 - beta2) * gradient * gradient, self._sq[name])
+                _ = self._avg[name].copy_(avg)
+                _ = self._sq[name].copy_(sq)
+                denom = sqrt(sq) / sqrt(second).view(shape) + self._eps.view(shape)
+                update = (self._lr / first).view(shape) * avg / denom
+                _ = param.sub_(where(keep, update, 0))
+    def reset(self, member: int) -> None:
+        '''Reinitialize the parameters and the optimizer state of one member.'''
+        module = self.members[member]
+        _ = getattr(module, 'reset')()
+        with no_grad():
+            for (name, param) in module.named_parameters():
+                _ = self.params[f'module.{name}'][member].copy_(param)
+                _ = self._avg[f'module.{name}'][member].zero_()
+                _ = self._sq[f'module.{name}'][member].zero_()
+            _ = self._steps[member].zero_()
+    def sync(self) -> None:
+        '''Write the stacked state back into the members.'''
+        with no_grad():
+            for (i, member) in enumerate(self.members):
+                for (name, param) in member.named_parameters():
+                    _ = param.copy_(self.params[f'module.{name}'][i])
+                for (name, buffer) in member.named_buffers():
+                    _ = buffer.copy_(self.buffers[f'module.{name}'][i])
+    def snapshot(self) -> dict[str, Tensor]:
+        '''Copy the buffers, which the forward pass updates for every member.'''
+        return {name: buffer.clone() for (name, buffer) in self.buffers.items()}
+    def restore(self, snapshot: dict[str, Tensor], active: Tensor) -> None:
+        '''Restore the buffers of the inactive members.'''
+        with no_grad():
+            for (name, buffer) in self.buffers.items():
+                keep = active.view((-1,) + (1,) * (buffer.dim() - 1))
+                _ = buffer.copy_(where(keep, buffer, snapshot[name]))
+
+
+def _base(member: Module, method: str) -> _Call:
+    '''Build a storage-free copy of a member calling one of its methods.'''
+    base = deepcopy(member).to('meta')
+    for module in base.modules():
+        ## the cached weights of the base would be keyed to tensors it does not own
+        if isinstance(module, (SphericalLayer, InteractionLayer)):
+            module.cached = False
+        ## a recomputed segment cannot be replayed inside vmap, the members are run whole instead
+        elif isinstance(module, CheckpointedSequential):
+            module.every = 0
+    return _Call(base, method)
+
+
+def _trainable(value: Any) -> bool:
+    '''Whether an object graph, such as a loader, holds a tensor requiring gradients.'''
+    (seen, stack) = (set[int](), [value])
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        if isinstance(item, Tensor):
+            if item.requires_grad:
+                return True
+        elif isinstance(item, dict):
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+        elif hasattr(item, '__dict__'):
+            stack.extend(vars(item).values())
+    return False
+
+
+class Ensemble[R: int, C: int, L: int, D: int]:
+    '''
+    Trainer for many structurally identical GANs sharing a loader.
+
+    The parameters of the generators and of the discriminators are stacked along a leading model
+    dimension and every step runs all members as batched kernels through `torch.func.vmap`, on one
+    loader batch shared by all members. Every member keeps its own Adam state and hyperparameters
+    and follows its own regimen; a stopped member is still computed but no longer updated.
+    Members with a latent source draw their latents from their own source before the batched pass,
+    and checkpointed members run without recomputation. Learning rate schedulers are not replayed,
+    and loaders with trainable connectors, such as random effect tables, are rejected, since one
+    connector cannot follow every member.
+
+    Type parameters:
+        R: The number of raw data inputs.
+        C: The number of conditions.
+        L: The number of latent inputs.
+        D: The number of data inputs.
+
+    '''
+
+    def __init__(
+        self,
+        generators: Sequence[BasicGenerator[C, L, D]],
+        discriminators: Sequence[BasicDiscriminator[C, D]],
+        loader: Loader[R, C, D],
+        device: Device = 'cpu'
+    ) -> None:
+        '''
+        Initialize the ensemble.
+
+        Args:
+            generators (Sequence[BasicGenerator]): The generators, one per member.
+            discriminators (Sequence[BasicDiscriminator]): The discriminators, one per member.
+            loader (Loader): The loader shared by every member.
+            device (Device): The device to use.
+
+        '''
+        assert len(generators) == len(discriminators) > 0, 'Every member needs a generator and a discriminator.'
+        assert not _trainable(loader), 'The ensemble cannot train the connector of a loader.'
+        self.__device = check_device(device)
+        for (generator, discriminator) in zip(generators, discriminators):
+            _ = generator.move(self.__device).train(True)
+            _ = discriminator.move(self.__device).train(True)
+        self.__generators = _Stack(generators, [generator.optimizer for generator in generators])
+        self.__discriminators = _Stack(discriminators, [discriminator.optimizer for discriminator in discriminators])
+        ## a latent source fills its buffer in place, so sourced members draw their latents outside vmap
+        self.__sourced = any(generator.source is not None for generator in generators)
+        self.__sample = vmap(
+            self.__call(_base(generators[0], 'generate' if self.__sourced else 'sample')),
+            in_dims = (0, None, 0) if self.__sourced else (0, None),
+            randomness = 'different'
+        )
+        self.__loss = vmap(
+            self.__call(_base(discriminators[0], 'loss')),
+            in_dims = (0, None, 0, None),
+            randomness = 'different'
+        )
+        self.__loader = loader.move(self.__device)
+        self.__intercept = vmap(self.__loader.intercept, in_dims = (None, 0), randomness = 'different')
+        self.__penalty = vmap(self.__loader.loss, in_dims = (None, 0), randomness = 'different')
+        self.__size = len(generators)
+        self.__active = ones(self.__size, dtype = torch_bool, device = self.__device)
+    @staticmethod
+    def __call(base: _Call) -> Callable[..., Tensor]:
+        '''Run a base module on the state of one member.'''
+        return lambda state, *args: functional_call(base, state, args)
+    def __generate[N: int](self, condition: Matrix[N, C], detach: bool) -> BatchedMatrix[int, N, D]:
+        '''Sample every generator on the same conditions and intercept the samples.'''
+        if self.__sourced:
+            latent = tstack([generator.latent(condition) for generator in self.generators])
+            generated = self.__sample(self.__generators.state(detach), condition, latent)
+        else:
+            generated = self.__sample(self.__generators.state(detach), condition)
+        if detach:
+            generated = generated.detach()
+        return BatchedMatrix.cast(generated, (self.__size, condition.shape[0], self.__loader.outputs))
+    def step(self, regimen: Regimen) -> Iterator[Tuple[int, Tuple[Tensor, Tensor]]]:
+        '''
+        Step every member.
+
+        Args:
+            regimen (Regimen): The regimen giving the batch sizes, shared by every member.
+
+        Yields:
+            Tuple[int, Tuple[Tensor, Tensor]]: The step number and the errors of every member.
+
+        '''
+        d_sub = int(regimen.batch * regimen.d_factor)
+        g_size = int(regimen.batch * regimen.g_factor)
+        trues = ones((g_size, 1), device = self.__device)
+        labels = cat(
+            (
+                Matrix.cast(ones((regimen.batch, 1), device = self.__device), (regimen.batch, Dim.one())),
+                Matrix.cast(zeros((d_sub, 1), device = self.__device), (d_sub, Dim.one()))
+            ),
+            dim = 0,
+            shape = (regimen.batch + d_sub, Dim.one())
+        )
+        i = 0
+        with device(self.__device):
+            while True:
+                snapshot = None if bool(self.__active.all()) else (
+                    self.__generators.snapshot(),
+                    self.__discriminators.snapshot()
+                )
+                d_error = zeros(self.__size)
+                for _ in range(regimen.k):
+                    r_sample = self.__loader.sample(regimen.batch)
+                    r_condition = self.__loader.condition(r_sample)
+                    r_data = self.__loader.prepare(r_sample)
+                    f_sample = self.__loader.sample(d_sub)
+                    f_condition = self.__loader.condition(f_sample)
+                    f_data = self.__intercept(f_condition, self.__generate(f_condition, True))
+                    data = BatchedMatrix.cast(
+                        tcat((BatchedMatrix.expand(r_data, self.__size), f_data), dim = 1),
+                        (self.__size, regimen.batch + d_sub, self.__loader.outputs)
+                    )
+                    condition = cat(
+                        (r_condition, f_condition),
+                        dim = 0,
+                        shape = (regimen.batch + d_sub, self.__loader.conditions)
+                    )
+                    loss = self.__loss(self.__discriminators.state(), condition, data, labels).reshape(self.__size)
+                    self.__discriminators.step(loss.sum(), self.__active)
+                    d_error = loss.detach()
+                f_sample = self.__loader.sample(g_size)
+                f_condition = self.__loader.condition(f_sample)
+                generated = self.__generate(f_condition, False)
+                f_data = self.__intercept(f_condition, generated)
+                d_loss = self.__loss(self.__discriminators.state(True), f_condition, f_data, trues).reshape(self.__size)
+                c_loss = self.__penalty(f_condition, generated).reshape(self.__size)
+                self.__generators.step((d_loss + c_loss).sum(), self.__active)
+                self.__loader.update()
+                if snapshot is not None:
+                    self.__generators.restore(snapshot[0], self.__active)
+                    self.__discriminators.restore(snapshot[1], self.__active)
+                yield i, (d_error, d_loss.detach())
+                i += 1
+    def train(self, regimens: Sequence[Regimen], report: Optional[EnsembleReporter] = None) -> list[Action]:
+        '''
+        Train every member until its regimen stops it.
+
+        Args:
+            regimens (Sequence[Regimen]): The regimen of every member, with the same batch sizes.
+            report (Optional[Callable]): The report function, also given the member; the regimens report if None.
+
+        Returns:
+            list[Action]: The final action of every member, 'stop' or 'escape'.
+
+        '''
+        assert len(regimens) == self.__size, 'Every member needs a regimen.'
+        settings = {(regimen.batch, regimen.k, regimen.d_factor, regimen.g_factor) for regimen in regimens}
+        assert len(settings) == 1, 'The members share their batches, so their regimens need the same batch sizes.'
+        outcomes: list[Action] = ['continue'] * self.__size
+        for i, (d_errors, g_errors) in self.step(regimens[0]):
+            (d_list, g_list) = (d_errors.tolist(), g_errors.tolist())
+            for member in range(self.__size):
+                if outcomes[member] != 'continue':
+                    continue
+                (command, message) = regimens[member].command(i, (d_list[member], g_list[member]))
+                if report is None:
+                    regimens[member].report(i, command, message, d_list[member], g_list[member])
+                else:
+                    report(member, i, command, message, d_list[member], g_list[member])
+                if command in ('stop', 'escape'):
+                    outcomes[member] = command
+                    _ = self.__active[member].fill_(False)
+                elif command == 'reset':
+                    self.__discriminators.reset(member)
+            if not bool(self.__active.any()):
+                break
+        self.sync()
+        return outcomes
+    def sync(self) -> None:
+        '''Write the trained state back into the member generators and discriminators.'''
+        self.__generators.sync()
+        self.__discriminators.sync()
+    @property
+    def generators(self) -> Sequence[BasicGenerator[C, L, D]]:
+        '''The member generators, up to date after `sync`.'''
+        return [generator for generator in self.__generators.members if isinstance(generator, BasicGenerator)]
+    @property
+    def discriminators(self) -> Sequence[BasicDiscriminator[C, D]]:
+        '''The member discriminators, up to date after `sync`.'''
+        return [
+            discriminator for discriminator in self.__discriminators.members
+            if isinstance(discriminator, BasicDiscriminator)
+        ]
+    @property
+    def size(self) -> int:
+        '''The number of members.'''
+        return self.__size
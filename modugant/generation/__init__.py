@@ -0,0 +1,13 @@
+'''Bulk generation of synthetic data.'''
+from .bulk import BulkSampler, Throughput
+from .fidelity import Fidelity, compare, fidelity
+from .program import program
+from .protocol import Decoder, Writer
+from .rejection import Rejection, RejectionSampler
+from .sharded import ShardedSampler, shard_seed
+from .writers import ArrowWriter, NpyWriter, compact
+
+__all__ = [
+    'ArrowWriter', 'BulkSampler', 'Decoder', 'Fidelity', 'NpyWriter', 'Rejection', 'RejectionSampler',
+    'ShardedSampler', 'Throughput', 'Writer', 'compact', 'compare', 'fidelity', 'program', 'shard_seed'
+]
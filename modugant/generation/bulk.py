@@ -0,0 +1,106 @@
+from time import perf_counter
+from typing import Iterator, NamedTuple, Optional
+
+from torch import Tensor, inference_mode
+
+from modugant.generation.protocol import Writer
+from modugant.generators.protocol import Generator
+from modugant.loaders.protocol import Loader
+from modugant.matrix.matrix import Matrix
+
+
+class Throughput(NamedTuple):
+    '''Rows generated, wall-clock seconds spent and the resulting rate.'''
+
+    rows: int
+    seconds: float
+    rate: float
+
+
+class BulkSampler[S: int, C: int, L: int, D: int]:
+    '''
+    Chunked sampler for large synthetic datasets.
+
+    Rows are generated in fixed-size chunks under inference mode, so memory is bounded by one chunk
+    regardless of the number of rows requested.
+    '''
+
+    def __init__(
+        self,
+        generator: Generator[C, L, D],
+        loader: Loader[S, C, D],
+        chunk: int = 65536,
+        unload: bool = False
+    ) -> None:
+        '''
+        Initialize the bulk sampler.
+
+        Args:
+            generator (Generator[C, L, D]): The generator, expected in evaluation mode.
+            loader (Loader[S, C, D]): The loader drawing conditions and intercepting outputs.
+            chunk (int): The number of rows generated at once.
+            unload (bool): Whether to decode the rows back to the raw space.
+
+        '''
+        assert chunk > 0, 'The chunk size must be positive.'
+        self._generator = generator
+        self._loader = loader
+        self._chunk = chunk
+        self._unload = unload
+    def _generate(self, n: int) -> Matrix[int, int]:
+        '''Generate one chunk of rows.'''
+        sample = self._loader.sample(n)
+        condition = self._loader.condition(sample)
+        generated = self._loader.intercept(condition, self._generator.sample(condition))
+        return self._loader.unload(generated) if self._unload else generated
+    def chunks(self, n: int) -> Iterator[Tensor]:
+        '''
+        Generate rows chunk by chunk.
+
+        Args:
+            n (int): The total number of rows.
+
+        Yields:
+            Tensor: The next chunk of at most `chunk` rows.
+
+        '''
+        for start in range(0, n, self._chunk):
+            ## inference mode is left before yielding so it never leaks into the caller
+            with inference_mode():
+                chunk = self._generate(min(self._chunk, n - start))
+            yield chunk
+    def run(self, n: int, writer: Optional[Writer] = None, out: Optional[Tensor] = None) -> Throughput:
+        '''
+        Generate rows into a writer or into preallocated storage.
+
+        Args:
+            n (int): The total number of rows.
+            writer (Optional[Writer]): The sink every chunk is written to.
+            out (Optional[Tensor (n, K)]): The storage the rows are copied into.
+
+        Returns:
+            Throughput: The number of rows, the seconds spent and the rows per second.
+
+        '''
+        assert (writer is None) != (out is None), 'Exactly one of a writer and an output must be given.'
+        assert out is None or out.shape[0] >= n, 'The output cannot hold all rows.'
+        start = perf_counter()
+        row = 0
+        for chunk in self.chunks(n):
+            if out is not None:
+                _ = out[row:row + chunk.shape[0]].copy_(chunk)
+            elif writer is not None:
+                writer.write(chunk)
+            row += chunk.shape[0]
+        if writer is not None:
+            writer.close()
+        seconds = perf_counter() - start
+        return Throughput(row, seconds, row / seconds if seconds > 0 else float('inf'))
+    @property
+    def generator(self) -> Generator[C, L, D]:
+        '''The generator.'''
+        return self._generator
+    @property
+    def loader(self) -> Loader[S, C, D]:
+        '''The loader.'''
+        return self._loader
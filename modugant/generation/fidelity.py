@@ -0,0 +1,79 @@
+from typing import NamedTuple
+
+from torch import Tensor, corrcoef, float64, inference_mode, manual_seed, where
+from torch.random import fork_rng
+
+from modugant.generation.protocol import Decoder
+from modugant.generators.protocol import Generator
+from modugant.matrix.matrix import Matrix
+
+
+class Fidelity(NamedTuple):
+    '''
+    Largest gaps between the statistics of a candidate and of a reference sample.
+
+    Attributes:
+        mean: The largest gap of a column mean, in reference standard deviations.
+        deviation: The largest relative gap of a column standard deviation.
+        correlation: The largest gap of a pairwise column correlation.
+
+    '''
+
+    mean: float
+    deviation: float
+    correlation: float
+
+
+def compare(reference: Tensor, candidate: Tensor) -> Fidelity:
+    '''
+    Compare the marginal and pairwise statistics of two samples of raw rows.
+
+    Args:
+        reference (Tensor (N, K)): The reference rows.
+        candidate (Tensor (M, K)): The candidate rows.
+
+    Returns:
+        Fidelity: The largest gaps; constant reference columns are compared on the raw scale.
+
+    '''
+    assert reference.shape[1] == candidate.shape[1], 'Both samples need the same columns.'
+    (reference, candidate) = (reference.to(float64), candidate.to(float64))
+    scale = reference.std(dim = 0)
+    scale = where(scale > 0, scale, 1.0)
+    mean = ((candidate.mean(dim = 0) - reference.mean(dim = 0)).abs() / scale).max()
+    deviation = (candidate.std(dim = 0) / scale - reference.std(dim = 0) / scale).abs().max()
+    ## constant columns have no correlation, they count as uncorrelated
+    correlation = (corrcoef(candidate.T).nan_to_num() - corrcoef(reference.T).nan_to_num()).abs().max()
+    return Fidelity(mean.item(), deviation.item(), correlation.item())
+
+
+def fidelity[C: int, L: int, D: int](
+    reference: Generator[C, L, D],
+    candidate: Generator[C, L, D],
+    condition: Matrix[int, C],
+    decoder: Decoder[C, D],
+    seed: int = 0
+) -> Fidelity:
+    '''
+    Compare the raw output of a candidate generator, such as a quantized one, against a reference.
+
+    Both generators sample the same conditions from the same random state, so the gaps measure the
+    approximation of the candidate rather than sampling noise.
+
+    Args:
+        reference (Generator[C, L, D]): The reference generator.
+        candidate (Generator[C, L, D]): The candidate generator.
+        condition (Matrix[N, C]): The conditions.
+        decoder (Decoder[C, D]): The loader or connector intercepting and unloading the output.
+        seed (int): The seed of the shared random state.
+
+    Returns:
+        Fidelity: The largest gaps of the unloaded statistics.
+
+    '''
+    samples: list[Tensor] = []
+    with inference_mode(), fork_rng():
+        for generator in (reference, candidate):
+            _ = manual_seed(seed)
+            samples.append(decoder.unload(decoder.intercept(condition, generator.sample(condition))))
+    return compare(samples[0], samples[1])
@@ -0,0 +1,91 @@
+from typing import Any
+
+from torch import Tensor, no_grad, rand, randint, randn, where
+from torch.jit import ScriptModule, export, freeze, script, trace
+from torch.nn import Module
+
+from modugant.conditions.empirical import EmpiricalConditions
+from modugant.generation.protocol import Decoder
+from modugant.generators.base import BasicGenerator
+from modugant.generators.frozen import FrozenGenerator
+from modugant.matrix.matrix import Matrix
+
+
+class _Body(Module):
+    '''The traced path from conditions and latent inputs to decoded rows.'''
+
+    def __init__(self, generator: FrozenGenerator[Any, Any, Any], decoder: Decoder[Any, Any], unload: bool) -> None:
+        super().__init__()
+        self.model = generator.model
+        self._generator = generator
+        self._decoder = decoder
+        self._unload = unload
+    def forward(self, condition: Tensor, latent: Tensor) -> Tensor:
+        generated = self._decoder.intercept(condition, self._generator.generate(condition, latent))
+        return self._decoder.unload(generated) if self._unload else generated
+
+
+class _Sampler(Module):
+    '''The scripted sampler drawing conditions and latent inputs for the traced body.'''
+
+    def __init__(self, body: ScriptModule, rows: Tensor, prob: Tensor, alias: Tensor, latents: int) -> None:
+        super().__init__()
+        self.body = body
+        self.register_buffer('rows', rows.clone())
+        self.register_buffer('prob', prob.clone())
+        self.register_buffer('alias', alias.clone())
+        self.latents = latents
+    def forward(self, n: int) -> Tensor:
+        rows: Tensor = self.rows
+        pick = randint(rows.shape[0], [n], device = rows.device)
+        keep = rand([n], device = rows.device) < self.prob[pick]
+        return self.generate(rows[where(keep, pick, self.alias[pick])])
+    @export
+    def generate(self, condition: Tensor) -> Tensor:
+        latent = randn([condition.shape[0], self.latents], dtype = self.prob.dtype, device = condition.device)
+        return self.body(condition, latent)
+
+
+def program[C: int, L: int, D: int](
+    generator: BasicGenerator[C, L, D] | FrozenGenerator[C, L, D],
+    decoder: Decoder[C, D],
+    conditions: EmpiricalConditions[C],
+    unload: bool = True,
+    example: int = 1024
+) -> ScriptModule:
+    '''
+    Compile the whole sampling path into one TorchScript program.
+
+    The generator forward, `intercept` and `unload` are traced on example conditions; the condition
+    draw and the latent draw are scripted around them, so the batch size stays dynamic. Weights, fitted
+    statistics and the alias table of the conditions are frozen into the program as constants, and the
+    saved program loads with `torch.jit.load` alone. Latent inputs are drawn standard normal, as the
+    generators draw them.
+
+    Args:
+        generator (BasicGenerator | FrozenGenerator): The generator, frozen before tracing if it is not.
+        decoder (Decoder[C, D]): The loader or connector intercepting and unloading the output.
+        conditions (EmpiricalConditions[C]): The distribution the program draws conditions from.
+        unload (bool): Whether the program decodes the rows back to the raw space.
+        example (int): The number of example rows traced.
+
+    Returns:
+        ScriptModule: The program; `program(n)` draws `n` rows and `program.generate(condition)`
+            generates rows for given conditions.
+
+    '''
+    frozen = generator.freeze() if isinstance(generator, BasicGenerator) else generator
+    (rows, prob, alias) = conditions.table
+    body = _Body(frozen, decoder, unload).train(False)
+    with no_grad():
+        ## the traced graph must not hold shapes of the example, checked on a second batch size
+        inputs = [
+            (
+                conditions.sample(size),
+                Matrix.cast(randn((size, frozen.latents), device = rows.device), (size, frozen.latents))
+            )
+            for size in (example, example // 2 + 1)
+        ]
+        traced = trace(body, inputs[0], check_inputs = inputs, check_trace = True)
+    sampler = script(_Sampler(traced, rows, prob, alias, frozen.latents).train(False))
+    return freeze(sampler, preserved_attrs = ['generate'])
@@ -0,0 +1,70 @@
+from typing import Any, Protocol
+
+from torch import Tensor
+
+from modugant.matrix.matrix import Matrix
+
+
+class Writer(Protocol):
+    '''
+    Sink for chunks of generated rows.
+
+    Abstract methods (must be implemented in subclass):
+        write: Consume one chunk of rows.
+            (chunk: Tensor) -> None
+        close: Flush everything written so far.
+            () -> None
+
+    '''
+
+    def write(self, chunk: Tensor) -> None:
+        '''
+        Consume one chunk of rows.
+
+        Args:
+            chunk (Tensor (N, K)): The rows, in generation order.
+
+        '''
+        ...
+    def close(self) -> None:
+        '''Flush everything written so far.'''
+        ...
+
+
+class Decoder[C: int, D: int](Protocol):
+    '''
+    Decoder of generated data back to the raw space, such as a loader or a connector.
+
+    Abstract methods (must be implemented in subclass):
+        intercept: Prepare the generated data into discriminable data.
+            [N: int](condition: Matrix[N, C], intermediate: Matrix[N, D]) -> Matrix[N, D]
+        unload: Revert to the raw data.
+            [N: int](data: Matrix[N, D]) -> Matrix[N, Any]
+
+    '''
+
+    def intercept[N: int](self, condition: Matrix[N, C], intermediate: Matrix[N, D]) -> Matrix[N, D]:
+        '''
+        Prepare the generated data into discriminable data.
+
+        Args:
+            condition (Matrix[N, C]): The conditions.
+            intermediate (Matrix[N, D]): The generated data.
+
+        Returns:
+            Matrix[N, D]: The discriminable data.
+
+        '''
+        ...
+    def unload[N: int](self, data: Matrix[N, D]) -> Matrix[N, Any]:
+        '''
+        Revert to the raw data.
+
+        Args:
+            data (Matrix[N, D]): The discriminable data.
+
+        Returns:
+            Matrix[N, Any]: The raw data.
+
+        '''
+        ...
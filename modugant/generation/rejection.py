@@ -0,0 +1,183 @@
+from time import perf_counter
+from typing import Iterator, NamedTuple, Optional
+from warnings import warn
+
+from torch import Tensor, exp, inference_mode, log1p, logit, quantile, rand, sigmoid
+
+from modugant.discriminators.extended import ExtendedDiscriminator
+from modugant.discriminators.pooled import PooledDiscriminator
+from modugant.discriminators.protocol import Discriminator
+from modugant.discriminators.sphere import SphereDiscriminator
+from modugant.generation.protocol import Writer
+from modugant.generators.protocol import Generator
+from modugant.loaders.protocol import Loader
+from modugant.matrix.matrix import Matrix
+
+_EPSILON = 1e-6
+
+
+class Rejection(NamedTuple):
+    '''Rows accepted, rows drawn, wall-clock seconds spent and the resulting rates.'''
+
+    rows: int
+    drawn: int
+    seconds: float
+    rate: float
+    acceptance: float
+
+
+def _probabilities(discriminator: Discriminator[int, int]) -> bool:
+    '''Whether a discriminator, or the one it wraps, predicts probabilities rather than logits.'''
+    while True:
+        if isinstance(discriminator, ExtendedDiscriminator):
+            discriminator = discriminator._discriminator # pyright: ignore[reportPrivateUsage]
+        elif isinstance(discriminator, PooledDiscriminator):
+            discriminator = discriminator._main # pyright: ignore[reportPrivateUsage]
+        else:
+            return isinstance(discriminator, SphereDiscriminator)
+
+
+class RejectionSampler[S: int, C: int, L: int, D: int]:
+    '''
+    Chunked discriminator rejection sampler.
+
+    Rows are generated and scored by the discriminator in chunks under inference mode, and each row is
+    kept with probability `sigmoid(F - gamma)`, where `F = d - d_max - log(1 - exp(d - d_max))` for the
+    discriminator logit `d`. The largest logit `d_max` and the threshold `gamma` are estimated on a
+    burn-in chunk, `d_max` growing whenever a larger logit is seen. Accepted rows are gathered into a
+    buffer of one chunk, so memory is bounded by two chunks regardless of the number of rows requested.
+    A warning is raised when ties among the scores, from a saturated or constant discriminator, keep
+    the percentile from being met.
+    '''
+
+    def __init__(
+        self,
+        generator: Generator[C, L, D],
+        discriminator: Discriminator[C, D],
+        loader: Loader[S, C, D],
+        chunk: int = 65536,
+        percentile: float = 0.95,
+        probabilities: Optional[bool] = None,
+        unload: bool = False
+    ) -> None:
+        '''
+        Initialize the rejection sampler.
+
+        Args:
+            generator (Generator[C, L, D]): The generator, expected in evaluation mode.
+            discriminator (Discriminator[C, D]): The discriminator, expected in evaluation mode.
+            loader (Loader[S, C, D]): The loader drawing conditions and intercepting outputs.
+            chunk (int): The number of rows generated and scored at once, also the burn-in size.
+            percentile (float): The quantile of `F` on the burn-in chunk taken as `gamma`; higher keeps
+                fewer, more realistic rows.
+            probabilities (Optional[bool]): Whether the discriminator predicts probabilities, such as a
+                sphere discriminator, rather than unbounded logits or critic values, such as a standard
+                one; inferred from the type of the discriminator if None.
+            unload (bool): Whether to decode the rows back to the raw space.
+
+        '''
+        assert chunk > 0, 'The chunk size must be positive.'
+        assert 0 <= percentile < 1, 'The percentile must be in [0, 1).'
+        self._generator = generator
+        self._discriminator = discriminator
+        self._loader = loader
+        self._chunk = chunk
+        self._percentile = percentile
+        self._probabilities = _probabilities(discriminator) if probabilities is None else probabilities
+        self._unload = unload
+        self._drawn = 0
+    def _score(self) -> tuple[Matrix[int, int], Tensor]:
+        '''Generate one chunk of rows with their discriminator logits.'''
+        condition = self._loader.condition(self._loader.sample(self._chunk))
+        data = self._loader.intercept(condition, self._generator.sample(condition))
+        predicted = self._discriminator.predict(condition, data).reshape(-1)
+        assert bool(predicted.isfinite().all()), 'The discriminator scores must be finite.'
+        if self._probabilities and not bool(((predicted >= 0) & (predicted <= 1)).all()):
+            warn(
+                'The discriminator predicts values outside [0, 1], which are clipped before taking their logit, '
+                'so the rows beyond either bound are tied.',
+                RuntimeWarning
+            )
+        self._drawn += self._chunk
+        return (data, logit(predicted, _EPSILON) if self._probabilities else predicted)
+    def chunks(self, n: int) -> Iterator[Tensor]:
+        '''
+        Generate accepted rows chunk by chunk.
+
+        Args:
+            n (int): The total number of accepted rows.
+
+        Yields:
+            Tensor: The next chunk of at most `chunk` accepted rows.
+
+        '''
+        self._drawn = 0
+        (buffer, filled, done, gamma, highest) = (None, 0, 0, 0.0, None)
+        while done < n:
+            ready: list[Tensor] = []
+            ## inference mode is left before yielding so it never leaks into the caller
+            with inference_mode():
+                (data, scores) = self._score()
+                if highest is None:
+                    highest = scores.max()
+                    burn = scores - highest
+                    ## rows tied at the largest score are accepted with probability 1/2 whatever the percentile
+                    tied = float((burn == 0).double().mean())
+                    if tied > 1 - self._percentile:
+                        warn(
+                            f'{tied:.0%} of the burn-in scores are tied at the largest, so the percentile cannot '
+                            'be met; the discriminator may be saturated or constant.',
+                            RuntimeWarning
+                        )
+                    gamma = quantile((burn - log1p(-exp(burn - _EPSILON))).double(), self._percentile).item()
+                highest = highest.maximum(scores.max())
+                shifted = scores - highest
+                threshold = sigmoid(shifted - log1p(-exp(shifted - _EPSILON)) - gamma)
+                accept = rand(len(scores), device = scores.device) < threshold
+                kept = data[accept][:n - done - filled]
+                if buffer is None:
+                    buffer = data.new_empty((min(self._chunk, n), data.shape[1]))
+                ## the accept buffer is flushed whenever it fills, its overflow starts the next one
+                while len(kept) > 0:
+                    take = min(len(kept), len(buffer) - filled)
+                    _ = buffer[filled:filled + take].copy_(kept[:take])
+                    (kept, filled) = (kept[take:], filled + take)
+                    if filled == len(buffer) or done + filled == n:
+                        ready.append(self._loader.unload(buffer[:filled]) if self._unload else buffer[:filled].clone())
+                        done += filled
+                        filled = 0
+            yield from ready
+    def run(self, n: int, writer: Optional[Writer] = None, out: Optional[Tensor] = None) -> Rejection:
+        '''
+        Generate accepted rows into a writer or into preallocated storage.
+
+        Args:
+            n (int): The total number of accepted rows.
+            writer (Optional[Writer]): The sink every chunk is written to.
+            out (Optional[Tensor (n, K)]): The storage the rows are copied into.
+
+        Returns:
+            Rejection: The rows accepted and drawn, the seconds spent, the accepted rows per second and
+                the acceptance rate.
+
+        '''
+        assert (writer is None) != (out is None), 'Exactly one of a writer and an output must be given.'
+        assert out is None or out.shape[0] >= n, 'The output cannot hold all rows.'
+        start = perf_counter()
+        row = 0
+        for chunk in self.chunks(n):
+            if out is not None:
+                _ = out[row:row + chunk.shape[0]].copy_(chunk)
+            elif writer is not None:
+                writer.write(chunk)
+            row += chunk.shape[0]
+        if writer is not None:
+            writer.close()
+        seconds = perf_counter() - start
+        return Rejection(
+            row,
+            self._drawn,
+            seconds,
+            row / seconds if seconds > 0 else float('inf'),
+            row / self._drawn if self._drawn > 0 else 0.0
+        )
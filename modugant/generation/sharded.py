@@ -0,0 +1,173 @@
+from hashlib import blake2b
+from os import cpu_count
+from time import perf_counter
+from typing import Any, Callable, NamedTuple, Optional
+
+from torch import Tensor, manual_seed, set_num_threads
+from torch.multiprocessing import get_context
+from torch.nn import Module
+from torch.random import fork_rng
+
+from modugant.generation.bulk import BulkSampler, Throughput
+from modugant.generation.protocol import Writer
+from modugant.generators.protocol import Generator
+from modugant.loaders.protocol import Loader
+
+type WriterFactory = Callable[[int], Writer]
+
+
+def shard_seed(seed: int, shard: int) -> int:
+    '''
+    Derive the seed of a shard from the global seed.
+
+    Args:
+        seed (int): The global seed.
+        shard (int): The shard number.
+
+    Returns:
+        int: A 63-bit seed, independent of the worker the shard runs on.
+
+    '''
+    digest = blake2b(f'{seed}:{shard}'.encode(), digest_size = 8).digest()
+    return int.from_bytes(digest, 'little') >> 1
+
+
+class _Shard(NamedTuple):
+    '''A contiguous range of rows generated from one seed.'''
+
+    shard: int
+    start: int
+    rows: int
+    seed: int
+
+
+## per-process state of a worker, set once by the pool initializer
+_worker: dict[str, Any] = {}
+
+
+def _initialize(
+    sampler: BulkSampler[Any, Any, Any, Any],
+    threads: int,
+    writers: Optional[WriterFactory],
+    out: Optional[Tensor]
+) -> None:
+    '''Install the sampler shipped to this worker.'''
+    set_num_threads(threads)
+    _worker.update(sampler = sampler, writers = writers, out = out)
+
+
+def _seed(sampler: BulkSampler[Any, Any, Any, Any], seed: int) -> None:
+    '''Reset every random stream and every stateful sampler the sampler draws from.'''
+    _ = manual_seed(seed)
+    ## a cursor left by an earlier shard on this worker would make the output depend on the shard order
+    sampler.loader.restart()
+    source = getattr(sampler.generator, 'source', None)
+    if source is not None:
+        source.seed(seed)
+
+
+def _run(
+    sampler: BulkSampler[Any, Any, Any, Any],
+    writers: Optional[WriterFactory],
+    out: Optional[Tensor],
+    shard: _Shard
+) -> Throughput:
+    '''Generate one shard from its own seed.'''
+    _seed(sampler, shard.seed)
+    if out is not None:
+        return sampler.run(shard.rows, out = out[shard.start:shard.start + shard.rows])
+    assert writers is not None
+    return sampler.run(shard.rows, writer = writers(shard.shard))
+
+
+def _generate(shard: _Shard) -> Throughput:
+    '''Generate one shard inside a worker.'''
+    return _run(_worker['sampler'], _worker['writers'], _worker['out'], shard)
+
+
+class ShardedSampler[S: int, C: int, L: int, D: int]:
+    '''
+    Sampler splitting a release into fixed-size shards generated by a pool of processes.
+
+    Every shard is seeded from (seed, shard) alone, so the concatenated output does not depend on the
+    number of workers. The generator and loader are shipped to the workers once, with their tensors in
+    shared memory. Samplers and latent sources must draw from the global or a seedable stream, and the
+    loader is restarted before every shard, so a sequential sampler replays from its first row in
+    every shard and the loader of an in-process run is left restarted.
+    '''
+
+    def __init__(
+        self,
+        generator: Generator[C, L, D],
+        loader: Loader[S, C, D],
+        shard: int = 1 << 20,
+        chunk: int = 65536,
+        unload: bool = False
+    ) -> None:
+        '''
+        Initialize the sharded sampler.
+
+        Args:
+            generator (Generator[C, L, D]): The generator, expected in evaluation mode.
+            loader (Loader[S, C, D]): The loader drawing conditions and intercepting outputs.
+            shard (int): The number of rows per shard.
+            chunk (int): The number of rows generated at once within a shard.
+            unload (bool): Whether to decode the rows back to the raw space.
+
+        '''
+        assert shard > 0, 'The shard size must be positive.'
+        self._sampler = BulkSampler(generator, loader, min(chunk, shard), unload)
+        self._shard = shard
+    def shards(self, n: int, seed: int) -> list[_Shard]:
+        '''Split n rows into seeded shards.'''
+        return [
+            _Shard(i, start, min(self._shard, n - start), shard_seed(seed, i))
+            for (i, start) in enumerate(range(0, n, self._shard))
+        ]
+    def run(
+        self,
+        n: int,
+        seed: int,
+        workers: int,
+        writers: Optional[WriterFactory] = None,
+        out: Optional[Tensor] = None
+    ) -> Throughput:
+        '''
+        Generate rows in parallel.
+
+        Args:
+            n (int): The total number of rows.
+            seed (int): The global seed.
+            workers (int): The number of worker processes; 0 generates in this process.
+            writers (Optional[WriterFactory]): A picklable factory returning the writer of a shard.
+            out (Optional[Tensor (n, K)]): Host storage the rows are copied into, moved to shared memory.
+
+        Returns:
+            Throughput: The number of rows, the wall-clock seconds spent and the rows per second.
+
+        '''
+        assert (writers is None) != (out is None), 'Exactly one of writers and an output must be given.'
+        assert out is None or (out.device.type == 'cpu' and out.shape[0] >= n), (
+            'The output must hold all rows on the host.'
+        )
+        shards = self.shards(n, seed)
+        start = perf_counter()
+        if workers == 0:
+            ## the global stream of this process is restored once the shards are done
+            with fork_rng(devices = []):
+                rows = sum(_run(self._sampler, writers, out, shard).rows for shard in shards)
+        else:
+            if out is not None:
+                _ = out.share_memory_()
+            for module in (self._sampler.generator, self._sampler.loader):
+                if isinstance(module, Module):
+                    _ = module.share_memory()
+            threads = max(1, (cpu_count() or 1) // workers)
+            with get_context('spawn').Pool(
+                workers,
+                initializer = _initialize,
+                initargs = (self._sampler, threads, writers, out)
+            ) as pool:
+                rows = sum(throughput.rows for throughput in pool.imap(_generate, shards))
+        seconds = perf_counter() - start
+        return Throughput(rows, seconds, rows / seconds if seconds > 0 else float('inf'))
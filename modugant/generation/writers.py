@@ -0,0 +1,144 @@
+'''
+Chunk writers encoding generated rows into compact on-disk columns.
+
+Classes:
+    NpyWriter: Write every chunk as a structured NumPy `.npy` file.
+    ArrowWriter: Append every chunk as a record batch of an Arrow IPC file.
+
+Functions:
+    compact: Choose the smallest dtype holding the codes of each categorical column.
+'''
+from os import makedirs, path
+from typing import Any, Sequence, override
+
+from torch import Tensor
+
+from modugant.generation.protocol import Writer
+
+_INTEGERS = ('int8', 'int16', 'int32', 'int64')
+
+
+def compact(columns: int, categories: dict[int, int]) -> list[str]:
+    '''
+    Choose compact dtypes for raw columns.
+
+    Args:
+        columns (int): The number of raw columns.
+        categories (dict[int, int]): The number of levels of each categorical column, by position.
+
+    Returns:
+        list[str]: The smallest signed integer dtype holding the codes of a categorical column,
+            and float32 for every continuous column.
+
+    '''
+    dtypes = ['float32'] * columns
+    for (column, levels) in categories.items():
+        dtypes[column] = next(
+            dtype for (dtype, bits) in zip(_INTEGERS, (8, 16, 32, 64)) if levels <= 1 << (bits - 1)
+        )
+    return dtypes
+
+
+def _encode(chunk: Tensor, dtypes: Sequence[str]) -> list[Any]:
+    '''Convert the columns of a chunk to host arrays of their compact dtypes.'''
+    host = chunk.detach().cpu().numpy()
+    return [
+        (host[:, i].round() if dtype in _INTEGERS else host[:, i]).astype(dtype)
+        for (i, dtype) in enumerate(dtypes)
+    ]
+
+
+class NpyWriter(Writer):
+    '''
+    Write every chunk as a structured NumPy `.npy` file.
+
+    Files are named `{prefix}-{shard:05d}-{part:05d}.npy`, so the shards of a sharded run sort in
+    generation order. Memory is bounded by one encoded chunk.
+    '''
+
+    def __init__(
+        self,
+        directory: str,
+        names: Sequence[str],
+        dtypes: Sequence[str],
+        shard: int = 0,
+        prefix: str = 'part'
+    ) -> None:
+        '''
+        Initialize the writer.
+
+        Args:
+            directory (str): The output directory, created if missing.
+            names (Sequence[str]): The column names.
+            dtypes (Sequence[str]): The NumPy dtype of each column.
+            shard (int): The shard number, part of every file name.
+            prefix (str): The file name prefix.
+
+        '''
+        from numpy import dtype
+        assert len(names) == len(dtypes), 'Every column needs a dtype.'
+        makedirs(directory, exist_ok = True)
+        self._directory = directory
+        self._names = list(names)
+        self._dtypes = list(dtypes)
+        self._record = dtype(list(zip(names, dtypes)))
+        self._prefix = f'{prefix}-{shard:05d}'
+        self._parts = 0
+    @override
+    def write(self, chunk: Tensor) -> None:
+        from numpy import empty, save
+        records = empty(chunk.shape[0], dtype = self._record)
+        for (name, column) in zip(self._names, _encode(chunk, self._dtypes)):
+            records[name] = column
+        save(path.join(self._directory, f'{self._prefix}-{self._parts:05d}.npy'), records)
+        self._parts += 1
+    @override
+    def close(self) -> None:
+        pass
+
+
+class ArrowWriter(Writer):
+    '''
+    Append every chunk as a record batch of an Arrow IPC file.
+
+    Requires `pyarrow`. Memory is bounded by one encoded chunk.
+    '''
+
+    def __init__(
+        self,
+        directory: str,
+        names: Sequence[str],
+        dtypes: Sequence[str],
+        shard: int = 0,
+        prefix: str = 'part'
+    ) -> None:
+        '''
+        Initialize the writer.
+
+        Args:
+            directory (str): The output directory, created if missing.
+            names (Sequence[str]): The column names.
+            dtypes (Sequence[str]): The NumPy dtype of each column.
+            shard (int): The shard number, part of the file name.
+            prefix (str): The file name prefix.
+
+        '''
+        try:
+            import pyarrow as pa
+        except ImportError as error:
+            raise ImportError('ArrowWriter requires pyarrow.') from error
+        assert len(names) == len(dtypes), 'Every column needs a dtype.'
+        makedirs(directory, exist_ok = True)
+        self._pa = pa
+        self._dtypes = list(dtypes)
+        self._schema = pa.schema([(name, pa.from_numpy_dtype(dtype)) for (name, dtype) in zip(names, dtypes)])
+        self._sink = pa.OSFile(path.join(directory, f'{prefix}-{shard:05d}.arrow'), 'wb')
+        self._writer = pa.ipc.new_file(self._sink, self._schema)
+    @override
+    def write(self, chunk: Tensor) -> None:
+        columns = [self._pa.array(column) for column in _encode(chunk, self._dtypes)]
+        self._writer.write_batch(self._pa.record_batch(columns, schema = self._schema))
+    @override
+    def close(self) -> None:
+        self._writer.close()
+        self._sink.close()
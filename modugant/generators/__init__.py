@@ -1,7 +1,8 @@
 '''Pre-defined GAN generators.'''
 from .base import BasicGenerator
+from .frozen import FrozenGenerator
 from .protocol import Generator
 from .residual import ResidualGenerator
 from .sequential import SequentialGenerator
 
-__all__ = ['BasicGenerator', 'Generator', 'ResidualGenerator', 'SequentialGenerator']
+__all__ = ['BasicGenerator', 'FrozenGenerator', 'Generator', 'ResidualGenerator', 'SequentialGenerator']
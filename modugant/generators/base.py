@@ -1,16 +1,24 @@
 '''Basic generator model for GANs.'''
 from abc import abstractmethod
-from typing import Self, override
+from copy import deepcopy
+from functools import partial
+from typing import Any, Dict, Optional, Self, override
 
 from torch import Tensor, no_grad
 from torch.nn import Linear, Module
 from torch.optim import Optimizer
+from torch.optim.lr_scheduler import LRScheduler
 
 from modugant.device import Device, check_device
+from modugant.generators.frozen import FrozenGenerator, normal
 from modugant.generators.protocol import Generator
+from modugant.latents.protocol import LatentSource
+from modugant.layers.folded import FoldedLayer
+from modugant.layers.interactive import InteractionLayer
+from modugant.layers.linear.linear import LinearLayer
+from modugant.layers.parts import forward_parts
 from modugant.matrix import Matrix
 from modugant.matrix.dim import One
-from modugant.matrix.ops import cat
 
 
 class BasicGenerator[C: int, L: int, G: int](Module, Generator[C, L, G]):
@@ -33,7 +41,8 @@ class BasicGenerator[C: int, L: int, G: int](Module, Generator[C, L, G]):
         self,
         conditions: C,
         latents: L,
-        intermediates: G
+        intermediates: G,
+        source: Optional[LatentSource[C, L]] = None
     ):
         '''
         Initialize the generator model.
@@ -42,6 +51,8 @@ class BasicGenerator[C: int, L: int, G: int](Module, Generator[C, L, G]):
             conditions (C: int): The number of condition nodes.
             latents (L: int): The number of input nodes.
             intermediates (G: int): The number of output nodes.
+            source (Optional[LatentSource[C, L]]): The source filling a pooled input buffer;
+                `_latent` and a concatenation are used if None.
             optimizer (Optimizer): The optimizer for the generator.
             device (Device): The device to use.
 
@@ -50,6 +61,7 @@ class BasicGenerator[C: int, L: int, G: int](Module, Generator[C, L, G]):
         self._conditions = conditions
         self._latents = latents
         self._intermediates = intermediates
+        self._source = source
     @abstractmethod
     def _latent[N: int](self, batch: N) -> Matrix[N, L]:
         '''
@@ -64,13 +76,55 @@ class BasicGenerator[C: int, L: int, G: int](Module, Generator[C, L, G]):
         '''
         ...
     @override
+    def __getstate__(self) -> Dict[str, Any]:
+        ## the optimizer and schedulers are training state, rebuilt by restart once loaded
+        return {
+            key: value for (key, value) in super().__getstate__().items()
+            if not isinstance(value, (Optimizer, LRScheduler))
+        }
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        '''Restore the generator and rebuild its optimizer.'''
+        super().__setstate__(state)
+        self.restart()
+    @override
     def forward(self, data: Tensor) -> Tensor:
         return self._model(data)
     @override
     def sample[N: int](self, condition: Matrix[N, C]) -> Matrix[N, G]:
-        latent = self._latent(condition.shape[0])
-        inputs = cat((condition, latent), dim = 1, shape = (condition.shape[0], self._conditions + self._latents))
-        return Matrix.cast(self.forward(inputs), shape = (condition.shape[0], self._intermediates))
+        if self._source is None:
+            return self.generate(condition, self._latent(condition.shape[0]))
+        output = self.forward(self._source.fill(condition))
+        return Matrix.cast(output, shape = (condition.shape[0], self._intermediates))
+    def latent[N: int](self, condition: Matrix[N, C]) -> Matrix[N, L]:
+        '''
+        Draw latent inputs for conditions, from the source if there is one.
+
+        Args:
+            condition (Matrix[N, C]): The conditions.
+
+        Returns:
+            Matrix[N, L]: The latent inputs.
+
+        '''
+        if self._source is None:
+            return self._latent(condition.shape[0])
+        filled = self._source.fill(condition)[:, self._conditions:].clone()
+        return Matrix.cast(filled, (condition.shape[0], self._latents))
+    def generate[N: int](self, condition: Matrix[N, C], latent: Matrix[N, L]) -> Matrix[N, G]:
+        '''
+        Generate data from given conditions and latent inputs.
+
+        Args:
+            condition (Matrix[N, C]): The conditions.
+            latent (Matrix[N, L]): The latent inputs.
+
+        Returns:
+            Matrix[N, G]: The generated data.
+
+        '''
+        ## the first layer takes the condition and the latent separately instead of their concatenation
+        output = forward_parts(self._model, (condition, latent))
+        return Matrix.cast(output, shape = (condition.shape[0], self._intermediates))
     @override
     def update(self, loss: Matrix[One, One]) -> None:
         self._optimizer.zero_grad()
@@ -80,14 +134,43 @@ class BasicGenerator[C: int, L: int, G: int](Module, Generator[C, L, G]):
     def reset(self) -> None:
         with no_grad():
             for module in self.modules():
-                if isinstance(module, Linear):
+                if isinstance(module, (Linear, LinearLayer, InteractionLayer)):
                     module.reset_parameters()
     @override
     def move(self, device: Device) -> Self:
+        if self._source is not None:
+            _ = self._source.move(device)
         return self.to(check_device(device))
     @override
     def train(self, mode: bool = True) -> Self:
         return super().train(mode)
+    def freeze(self, quantize: bool = False) -> FrozenGenerator[C, L, G]:
+        '''
+        Freeze the generator for inference.
+
+        Args:
+            quantize (bool): Whether to quantize the linear weights to int8 for CPU inference.
+
+        Returns:
+            FrozenGenerator[C, L, G]: A generator running a folded snapshot of the model, matching this
+                generator in evaluation mode, with standard normal latent inputs.
+
+        '''
+        model = FoldedLayer(self._conditions + self._latents, self._model)
+        ## the source fills a buffer in place, the snapshot gets its own so it can run beside training
+        source = deepcopy(self._source)
+        ## a standalone draw, as the generators draw, so the snapshot does not keep the training model
+        latent = partial(normal, self._latents)
+        frozen = FrozenGenerator(model, self._conditions, self._latents, latent, source)
+        return frozen.quantize() if quantize else frozen
+    @property
+    def source(self) -> Optional[LatentSource[C, L]]:
+        '''The source filling the input buffer, if any.'''
+        return self._source
+    @property
+    def optimizer(self) -> Optimizer:
+        '''The torch Optimizer for the generator.'''
+        return self._optimizer
     @property
     @override
     def rate(self) -> float:
@@ -0,0 +1,134 @@
+'''
+Frozen generator for inference.
+
+Classes:
+    FrozenGenerator: Inference-only generator running a folded copy of a generator model.
+
+Functions:
+    normal: Draw standard normal latent inputs.
+
+'''
+from copy import deepcopy
+from typing import Callable, Optional, Self, override
+
+from torch import device as torch_device
+from torch import randn
+
+from modugant.device import Device, check_device
+from modugant.generators.protocol import Generator
+from modugant.latents.protocol import LatentSource
+from modugant.layers.folded import FoldedLayer
+from modugant.matrix import Matrix
+from modugant.matrix.dim import One
+
+
+def normal[N: int, L: int](latents: L, batch: N, device: Optional[torch_device] = None) -> Matrix[N, L]:
+    '''
+    Draw standard normal latent inputs.
+
+    Args:
+        latents (L: int): The number of latent nodes.
+        batch (N: int): The number of latent inputs.
+        device (Optional[torch.device]): The device of the latent inputs; the default device if None.
+
+    Returns:
+        Matrix[N, L]: The latent inputs.
+
+    '''
+    return Matrix.cast(randn((batch, latents), device = device), (batch, latents))
+
+
+class FrozenGenerator[C: int, L: int, G: int](Generator[C, L, G]):
+    '''
+    Inference-only generator running a folded copy of a generator model.
+
+    The model is a snapshot: batch norms are folded into the weights with their running statistics,
+    dropout is dropped and activations run in place, so the output matches the original generator in
+    evaluation mode. A frozen generator cannot be trained.
+    '''
+
+    def __init__(
+        self,
+        model: FoldedLayer[int, G],
+        conditions: C,
+        latents: L,
+        latent: Callable[[int, torch_device], Matrix[int, L]],
+        source: Optional[LatentSource[C, L]] = None
+    ) -> None:
+        '''
+        Initialize the frozen generator.
+
+        Args:
+            model (FoldedLayer): The folded generator model, reading the condition and the latent input.
+            conditions (C: int): The number of condition nodes.
+            latents (L: int): The number of latent nodes.
+            latent (Callable[[int, torch.device], Matrix[int, L]]): The latent input of a batch size, on
+                the device of the conditions.
+            source (Optional[LatentSource[C, L]]): The source filling the whole input, used over `latent` if given.
+
+        '''
+        self._model = model.train(False).requires_grad_(False)
+        self._conditions = conditions
+        self._latents = latents
+        self._intermediates = model.dim
+        self._outputs = model.dim
+        self._latent = latent
+        self._source = source
+    @override
+    def sample[N: int](self, condition: Matrix[N, C]) -> Matrix[N, G]:
+        if self._source is None:
+            return self.generate(condition, self._latent(condition.shape[0], condition.device))
+        output = self._model(self._source.fill(condition))
+        return Matrix.cast(output, (condition.shape[0], self._intermediates))
+    def generate[N: int](self, condition: Matrix[N, C], latent: Matrix[N, L]) -> Matrix[N, G]:
+        '''
+        Generate data from given conditions and latent inputs.
+
+        Args:
+            condition (Matrix[N, C]): The conditions.
+            latent (Matrix[N, L]): The latent inputs.
+
+        Returns:
+            Matrix[N, G]: The generated data.
+
+        '''
+        output = self._model.forward_parts((condition, latent))
+        return Matrix.cast(output, (condition.shape[0], self._intermediates))
+    @override
+    def update(self, loss: Matrix[One, One]) -> None:
+        raise TypeError('A frozen generator cannot be trained.')
+    @override
+    def reset(self) -> None:
+        raise TypeError('A frozen generator cannot be trained.')
+    @override
+    def restart(self) -> None:
+        pass
+    @override
+    def move(self, device: Device) -> Self:
+        device = check_device(device)
+        self._model = self._model.to(device)
+        if self._source is not None:
+            _ = self._source.move(device)
+        return self
+    @override
+    def train(self, mode: bool = True) -> Self:
+        return self
+    def quantize(self) -> 'FrozenGenerator[C, L, G]':
+        '''
+        Quantize the generator for CPU inference.
+
+        Returns:
+            FrozenGenerator[C, L, G]: A CPU generator whose linear weights are int8.
+
+        '''
+        ## the copy gets its own source on the CPU, this generator keeps its device and fill buffer
+        source = None if self._source is None else deepcopy(self._source).move('cpu')
+        return FrozenGenerator(self._model.quantize(), self._conditions, self._latents, self._latent, source)
+    @property
+    def model(self) -> FoldedLayer[int, G]:
+        '''The folded model.'''
+        return self._model
+    @property
+    @override
+    def rate(self) -> float:
+        return 0.0
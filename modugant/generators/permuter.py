@@ -1,13 +1,12 @@
 from typing import Self, override
 
-from torch import Tensor
+from torch import Tensor, arange, randint, randperm, tensor
 
 from modugant.device import Device, check_device
 from modugant.generators.protocol import Generator
 from modugant.matrix import Index, Matrix
 from modugant.matrix.dim import One, Zero
 from modugant.matrix.index import Vector
-from modugant.matrix.ops import cat
 
 
 class PermutingGenerator[C: int, G: int, F: int](Generator[C, Zero, G]):
@@ -36,20 +35,24 @@ class PermutingGenerator[C: int, G: int, F: int](Generator[C, Zero, G]):
         assert sum(folds) == intermediates
         self._conditions = conditions
         self._intermediates = intermediates
-        matrix = Matrix.cast(data, shape = (data.shape[0], data.shape[1]))
-        self._splits = matrix[..., index].split(folds, dim = 1)
-        self._dim = data.shape[0]
+        ## the selected columns are stored once, the folds are column ranges of it
+        self._data = data[:, list(index)].contiguous()
+        self._sizes = tensor(list(folds), device = data.device)
+        self._starts = self._sizes.cumsum(0) - self._sizes
+        self._columns = arange(intermediates, device = data.device)
         self._device = data.device
     @override
     def sample[N: int](self, condition: Matrix[N, C]) -> Matrix[N, G]:
-        index = Index.sample(condition.shape[0], self._dim)
-        perm = Index.randperm(self._splits.dim)
-        permed = cat(
-            tuple(self._splits[i][index, ...] for i in perm),
-            dim = 1,
-            shape = (condition.shape[0], self._intermediates)
+        rows = randint(self._data.shape[0], (condition.shape[0], 1), device = self._data.device)
+        perm = randperm(len(self._sizes), device = self._data.device)
+        sizes = self._sizes[perm]
+        ## shift every output column back to the column of its fold in the data
+        shifts = (self._starts[perm] - (sizes.cumsum(0) - sizes)).repeat_interleave(
+            sizes,
+            output_size = self._intermediates
         )
-        return permed
+        permed = self._data[rows, self._columns + shifts]
+        return Matrix.cast(permed, (condition.shape[0], self._intermediates))
     @override
     def update(self, loss: Matrix[One, One]) -> None:
         pass
@@ -62,7 +65,13 @@ class PermutingGenerator[C: int, G: int, F: int](Generator[C, Zero, G]):
     @override
     def move(self, device: Device) -> Self:
         device = check_device(device)
-        self._splits = Vector((split.to(device) for split in self._splits), self._splits.dim)
+        (self._data, self._sizes, self._starts, self._columns) = (
+            self._data.to(device), self._sizes.to(device), self._starts.to(device), self._columns.to(device)
+        )
+        self._device = device
+        return self
+    @override
+    def train(self, mode: bool = True) -> Self:
         return self
     @property
     @override
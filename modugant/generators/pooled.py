@@ -1,7 +1,15 @@
-from typing import Self, Sequence, override
+from copy import deepcopy
+from typing import Any, Self, Sequence, cast, override
+
+from torch import Tensor, argsort, randperm
+from torch import cat as tcat
+from torch.func import functional_call, stack_module_state, vmap
 
 from modugant.device import Device
+from modugant.generators.base import BasicGenerator
 from modugant.generators.protocol import Generator
+from modugant.layers.interactive import InteractionLayer
+from modugant.layers.linear.sphere import SphericalLayer
 from modugant.matrix import Matrix
 from modugant.matrix.dim import One
 from modugant.matrix.index import Index
@@ -12,6 +20,10 @@ class PooledGenerator[C: int, L: int, G: int](Generator[C, L, G]):
     '''
     Combine a Generator with a non-learning pool of Generators.
 
+    In vectorized mode the pool members must be structurally identical basic generators. Their
+    parameters are stacked once and the whole pool runs as one batched forward pass, with the batch
+    split into equal parts through a single permutation instead of random contiguous parts.
+
     Type parameters:
         C: The number of conditions.
         L: The number of latent inputs.
@@ -26,6 +38,7 @@ class PooledGenerator[C: int, L: int, G: int](Generator[C, L, G]):
         intermediates: G,
         main: Generator[C, L, G],
         pool: Sequence[Generator[C, L, G]],
+        vectorized: bool = False
     ) -> None:
         '''
         Initialize the generator model.
@@ -36,6 +49,7 @@ class PooledGenerator[C: int, L: int, G: int](Generator[C, L, G]):
             intermediates (G: int): The number of output nodes.
             main (Generator): The main generator.
             pool (Sequence[Generator]): The pool of generators.
+            vectorized (bool): Whether to run the pool as one batched forward pass.
 
         '''
         self._conditions = conditions
@@ -43,8 +57,41 @@ class PooledGenerator[C: int, L: int, G: int](Generator[C, L, G]):
         self._intermediates = intermediates
         self._main = main
         self._pool = pool
+        self._vectorized = vectorized
+        if vectorized:
+            assert len(pool) > 0, 'A vectorized pool needs members.'
+            assert all(isinstance(member, BasicGenerator) for member in pool), (
+                'A vectorized pool needs basic generators.'
+            )
+            shapes = [
+                (type(member), [(name, tensor.shape) for (name, tensor) in member.state_dict().items()])
+                for member in pool
+            ]
+            assert all(shape == shapes[0] for shape in shapes), (
+                'A vectorized pool needs structurally identical members.'
+            )
+            self._stack()
+    def _stack(self) -> None:
+        '''Stack the state of the pool members into the batched copy run by the vectorized pass.'''
+        members = [member for member in self._pool if isinstance(member, BasicGenerator)]
+        (params, buffers) = stack_module_state(members)
+        self._state: tuple[dict[str, Tensor], dict[str, Tensor]] = (
+            {name: param.detach() for (name, param) in params.items()},
+            buffers
+        )
+        self._base: BasicGenerator[C, L, G] = deepcopy(members[0]).to('meta')
+        ## the cached weights of the base would be keyed to tensors it does not own
+        for module in self._base.modules():
+            if isinstance(module, (SphericalLayer, InteractionLayer)):
+                module.cached = False
+        _ = self._base.train(members[0].training)
+    def _member(self, state: tuple[dict[str, Tensor], dict[str, Tensor]], data: Tensor) -> Any:
+        '''Run the base generator on one member's stacked state.'''
+        return functional_call(self._base, state, (data,))
     @override
     def sample[N: int](self, condition: Matrix[N, C]) -> Matrix[N, G]:
+        if self._vectorized:
+            return self._sample_vectorized(condition)
         ## Use randperm to sample splits along the first dimension of the condtion
         ## Then sample from the main generator and the pool generators in those splits
         k = min(len(self._pool), condition.shape[0])
@@ -59,6 +106,29 @@ class PooledGenerator[C: int, L: int, G: int](Generator[C, L, G]):
             shape = (condition.shape[0] - len(splits[0]), self._intermediates)
         )
         return cat((main, pool), dim = 0, shape = (condition.shape[0], self._intermediates))
+    def _sample_vectorized[N: int](self, condition: Matrix[N, C]) -> Matrix[N, G]:
+        '''Sample the pool as one batched forward pass over equal parts of a permuted batch.'''
+        n = condition.shape[0]
+        ## every part holds at least one row, the main generator takes the remainder
+        k = min(len(self._pool), n - 1)
+        if k <= 0:
+            return self._main.sample(condition)
+        size = n // (k + 1)
+        rest = n - k * size
+        perm = randperm(n, device = condition.device)
+        main = self._main.sample(condition[perm[:rest]])
+        pooled = condition[perm[rest:]]
+        first = cast(BasicGenerator[C, L, G], self._pool[0])
+        latent = first._latent(k * size) # pyright: ignore[reportPrivateUsage]
+        data = tcat((pooled, latent), dim = 1).view(k, size, -1)
+        state = (
+            {name: p[:k] for (name, p) in self._state[0].items()},
+            {name: b[:k] for (name, b) in self._state[1].items()}
+        )
+        pool = vmap(self._member, randomness = 'different')(state, data).reshape(k * size, self._intermediates)
+        ## one gather puts every generated row back at the position of its condition
+        output = tcat((main, pool), dim = 0)[argsort(perm)]
+        return Matrix.cast(output, (n, self._intermediates))
     @override
     def update(self, loss: Matrix[One, One]) -> None:
         return self._main.update(loss)
@@ -67,6 +137,8 @@ class PooledGenerator[C: int, L: int, G: int](Generator[C, L, G]):
         self._main.reset()
         for generator in self._pool:
             generator.reset()
+        if self._vectorized:
+            self._stack()
     @override
     def restart(self) -> None:
         self._main.restart()
@@ -77,6 +149,16 @@ class PooledGenerator[C: int, L: int, G: int](Generator[C, L, G]):
         _ = self._main.move(device)
         for generator in self._pool:
             _ = generator.move(device)
+        if self._vectorized:
+            self._stack()
+        return self
+    @override
+    def train(self, mode: bool = True) -> Self:
+        _ = self._main.train(mode)
+        for generator in self._pool:
+            _ = generator.train(mode)
+        if self._vectorized:
+            _ = self._base.train(mode)
         return self
     @property
     @override
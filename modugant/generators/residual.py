@@ -5,12 +5,14 @@ Classes:
     ResidualLayer: Residual layer for a generator.
     ResidualGenerator: Generator model for GANs.
 '''
-from typing import override
+from typing import Optional, override
 
-from torch.nn import Sequential
 from torch.optim.adam import Adam
 
 from modugant.generators.base import BasicGenerator
+from modugant.latents.protocol import LatentSource
+from modugant.layers.checkpoint import sequential
+from modugant.layers.dense import DenseLayer
 from modugant.layers.isometric.norm import BatchNormLayer
 from modugant.layers.isometric.relu import RectifiedLayer
 from modugant.layers.linear.linear import LinearLayer
@@ -30,7 +32,10 @@ class ResidualGenerator[C: int, L: int, G: int](BasicGenerator[C, L, G]):
         intermediates: G,
         steps: list[int],
         learning: float = 0.1,
-        decay: float = 0
+        decay: float = 0,
+        dense: bool = False,
+        checkpoint: int = 0,
+        source: Optional[LatentSource[C, L]] = None
     ) -> None:
         '''
         Initialize the generator model.
@@ -42,31 +47,38 @@ class ResidualGenerator[C: int, L: int, G: int](BasicGenerator[C, L, G]):
             steps (list[int]): The number of nodes in each step of the generator.
             learning (float): The learning rate.
             decay (float): The weight decay
+            dense (bool): Whether to write every step into one preallocated feature buffer.
+            checkpoint (int): The number of steps per recomputed segment; 0 disables checkpointing.
+            source (Optional[LatentSource[C, L]]): The source filling a pooled input buffer.
 
         '''
+        assert not (dense and checkpoint), 'Checkpointing is not supported in dense mode.'
         super().__init__(
             conditions,
             latents,
-            intermediates
+            intermediates,
+            source
         )
         self._steps = steps
         cumul = [conditions + latents + sum(steps[:i]) for i in range(len(steps))]
         self._learning = learning
         self._decay = decay
-        self._model = Sequential(
-            *[
-                ResidualLayer(
-                    cumul[i],
-                    Index.range(cumul[i]),
-                    LinearLayer(
-                        steps[i],
-                        Index.range(cumul[i]),
-                        [BatchNormLayer(steps[i]), RectifiedLayer(steps[i])]
-                    )
-                )
-                for i in range(len(steps))
-            ],
-            LinearLayer(intermediates, Index.range(sum(steps) + conditions + latents))
+        self._dense = dense
+        blocks = [
+            LinearLayer(
+                steps[i],
+                Index.range(cumul[i]),
+                [BatchNormLayer(steps[i]), RectifiedLayer(steps[i])]
+            )
+            for i in range(len(steps))
+        ]
+        self._model = sequential(
+            *(
+                [DenseLayer(conditions + latents, blocks)] if dense else
+                [ResidualLayer(cumul[i] + steps[i], Index.range(cumul[i]), blocks[i]) for i in range(len(steps))]
+            ),
+            LinearLayer(intermediates, Index.range(sum(steps) + conditions + latents)),
+            every = checkpoint
         )
         self._optimizer = Adam(
             self.parameters(),
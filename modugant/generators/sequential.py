@@ -6,13 +6,14 @@ Classes:
 
 '''
 
-from typing import override
+from typing import Optional, override
 
-from torch.nn import Sequential
 from torch.optim.adam import Adam
 from torch.optim.lr_scheduler import StepLR
 
 from modugant.generators.base import BasicGenerator
+from modugant.latents.protocol import LatentSource
+from modugant.layers.checkpoint import sequential
 from modugant.layers.isometric.relu import RectifiedLayer
 from modugant.layers.isometric.sigmoid import SigmoidLayer
 from modugant.layers.linear.linear import LinearLayer
@@ -33,7 +34,9 @@ class SequentialGenerator[C: int, L: int, G: int](BasicGenerator[C, L, G]):
         steps: list[int],
         learning: float = 0.1,
         gamma: float = 0.99,
-        step: int = 100
+        step: int = 100,
+        checkpoint: int = 0,
+        source: Optional[LatentSource[C, L]] = None
     ) -> None:
         '''
         Initialize the generator model.
@@ -46,18 +49,21 @@ class SequentialGenerator[C: int, L: int, G: int](BasicGenerator[C, L, G]):
             learning (float): The learning rate.
             gamma (float): The gamma value for the learning rate scheduler.
             step (int): The step size for the learning rate scheduler.
+            checkpoint (int): The number of steps per recomputed segment; 0 disables checkpointing.
+            source (Optional[LatentSource[C, L]]): The source filling a pooled input buffer.
 
         '''
         super().__init__(
             conditions,
             latents,
-            intermediates
+            intermediates,
+            source
         )
         self._steps = steps
         self._learning = learning
         self._gamma = gamma
         self._step = step
-        self._model = Sequential(
+        self._model = sequential(
             *[
                 LinearLayer(
                     steps[i],
@@ -69,7 +75,8 @@ class SequentialGenerator[C: int, L: int, G: int](BasicGenerator[C, L, G]):
                 intermediates,
                 Index.range(steps[-1] if len(steps) else (conditions + latents)),
                 [SigmoidLayer(intermediates)]
-            )
+            ),
+            every = checkpoint
         )
         self._optimizer = Adam(self.parameters(), lr = learning)
         self.__scheduler = StepLR(self._optimizer, step_size = step, gamma = gamma)
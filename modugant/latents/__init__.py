@@ -0,0 +1,7 @@
+'''Latent sources for generators.'''
+from .buffered import BufferedSource
+from .normal import NormalSource
+from .protocol import LatentSource
+from .sobol import SobolSource
+
+__all__ = ['BufferedSource', 'LatentSource', 'NormalSource', 'SobolSource']
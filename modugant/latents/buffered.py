@@ -0,0 +1,86 @@
+from abc import abstractmethod
+from typing import Any, Dict, Optional, Self, override
+
+from torch import Generator as TorchGenerator
+from torch import Tensor, empty, is_inference_mode_enabled
+
+from modugant.device import Device, check_device
+from modugant.latents.protocol import LatentSource
+from modugant.matrix.matrix import Matrix
+
+
+class BufferedSource[C: int, L: int](LatentSource[C, L]):
+    '''
+    Latent source writing into one pooled (capacity, C + L) input buffer.
+
+    The buffer grows by doubling when a larger batch is requested and is otherwise reused, so a call
+    writes the condition and the noise in place instead of allocating and concatenating them.
+
+    Abstract methods (must be implemented in subclass):
+        _noise: Write noise into the latent columns of the buffer.
+            (latent: Tensor, generator: Optional[TorchGenerator]) -> None
+        seed: Seed the noise stream.
+            (seed: int) -> None
+
+    '''
+
+    def __init__(self, conditions: C, latents: L, capacity: int = 0) -> None:
+        '''
+        Initialize the source.
+
+        Args:
+            conditions (C: int): The number of condition nodes.
+            latents (L: int): The number of latent nodes.
+            capacity (int): The number of rows to preallocate.
+
+        '''
+        self._conditions = conditions
+        self._latents = latents
+        self._capacity = capacity
+        self._buffer: Optional[Tensor] = None
+    def __getstate__(self) -> Dict[str, Any]:
+        '''Return the state of the source without its buffer.'''
+        ## the buffer is scratch space, reallocated on the first call after loading
+        return {**self.__dict__, '_buffer': None}
+    @abstractmethod
+    def _noise(self, latent: Tensor, generator: Optional[TorchGenerator]) -> None:
+        '''
+        Write noise into the latent columns of the buffer.
+
+        Args:
+            latent (Tensor (N, L)): The latent columns of the buffer.
+            generator (Optional[TorchGenerator]): The random stream for this call only.
+
+        '''
+        ...
+    def _reserve(self, condition: Tensor) -> Tensor:
+        '''Return a buffer holding at least as many rows as the condition.'''
+        buffer = self._buffer
+        n = condition.shape[0]
+        ## a buffer allocated under inference mode cannot be written outside of it, and the reverse
+        ## would record the writes for autograd, so it is reallocated whenever the mode changes
+        if (
+            buffer is None or buffer.shape[0] < n
+            or buffer.device != condition.device or buffer.dtype != condition.dtype
+            or buffer.is_inference() != is_inference_mode_enabled()
+        ):
+            rows = max(n, self._capacity, 2 * buffer.shape[0] if buffer is not None and buffer.shape[0] < n else 0)
+            buffer = empty(
+                (rows, self._conditions + self._latents),
+                dtype = condition.dtype,
+                device = condition.device
+            )
+            self._buffer = buffer
+        return buffer[:n]
+    @override
+    def fill[N: int](self, condition: Matrix[N, C], generator: Optional[TorchGenerator] = None) -> Matrix[N, int]:
+        buffer = self._reserve(condition)
+        _ = buffer[:, :self._conditions].copy_(condition)
+        self._noise(buffer[:, self._conditions:], generator)
+        return Matrix.cast(buffer, (condition.shape[0], self._conditions + self._latents))
+    @override
+    def move(self, device: Device) -> Self:
+        device = check_device(device)
+        if self._buffer is not None and self._buffer.device.type != device:
+            self._buffer = None
+        return self
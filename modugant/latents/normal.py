@@ -0,0 +1,43 @@
+from typing import Optional, Self, override
+
+from torch import Generator as TorchGenerator
+from torch import Tensor, randint
+
+from modugant.device import Device, check_device
+from modugant.latents.buffered import BufferedSource
+
+
+class NormalSource[C: int, L: int](BufferedSource[C, L]):
+    '''Pseudo-random standard normal latent source.'''
+
+    def __init__(self, conditions: C, latents: L, capacity: int = 0, seed: Optional[int] = None) -> None:
+        '''
+        Initialize the source.
+
+        Args:
+            conditions (C: int): The number of condition nodes.
+            latents (L: int): The number of latent nodes.
+            capacity (int): The number of rows to preallocate.
+            seed (Optional[int]): The seed of a private random stream; the global stream is used if None.
+
+        '''
+        super().__init__(conditions, latents, capacity)
+        self.__device = 'cpu'
+        self.__generator: Optional[TorchGenerator] = None
+        if seed is not None:
+            self.seed(seed)
+    @override
+    def _noise(self, latent: Tensor, generator: Optional[TorchGenerator]) -> None:
+        _ = latent.normal_(generator = generator or self.__generator)
+    @override
+    def seed(self, seed: int) -> None:
+        self.__generator = TorchGenerator(self.__device).manual_seed(seed)
+    @override
+    def move(self, device: Device) -> Self:
+        device = check_device(device)
+        if self.__generator is not None and device != self.__device:
+            ## a stream is bound to its device, the new one continues from a seed drawn from the old one
+            seed = int(randint(2 ** 62, (1,), generator = self.__generator, device = self.__device))
+            self.__generator = TorchGenerator(device).manual_seed(seed)
+        self.__device = device
+        return super().move(device)
@@ -0,0 +1,60 @@
+from typing import Optional, Protocol, Self
+
+from torch import Generator as TorchGenerator
+
+from modugant.device import Device
+from modugant.matrix.matrix import Matrix
+
+
+class LatentSource[C: int, L: int](Protocol):
+    '''
+    Source of generator inputs.
+
+    Type parameters:
+        C: The number of conditions.
+        L: The number of latent inputs.
+
+    Abstract methods (must be implemented in subclass):
+        fill: Write the condition and fresh noise into the input buffer.
+            [N:int](condition: Matrix[N, C], generator: Optional[TorchGenerator]) -> Matrix[N, int]
+        seed: Seed the noise stream.
+            (seed: int) -> None
+        move: Move the source to a device.
+            (device: Device) -> Self
+
+    '''
+
+    def fill[N: int](self, condition: Matrix[N, C], generator: Optional[TorchGenerator] = None) -> Matrix[N, int]:
+        '''
+        Write the condition and fresh noise into the input buffer.
+
+        Args:
+            condition (Matrix[N, C]): The condition.
+            generator (Optional[TorchGenerator]): The random stream for this call only.
+
+        Returns:
+            Matrix[N, C + L]: A view of the input buffer, valid until the next call.
+
+        '''
+        ...
+    def seed(self, seed: int) -> None:
+        '''
+        Seed the noise stream.
+
+        Args:
+            seed (int): The seed.
+
+        '''
+        ...
+    def move(self, device: Device) -> Self:
+        '''
+        Move the source to a device.
+
+        Args:
+            device (Device): The device.
+
+        Returns:
+            Self: The source.
+
+        '''
+        ...
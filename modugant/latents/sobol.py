@@ -0,0 +1,49 @@
+from math import sqrt
+from typing import Optional, override
+
+from torch import Generator as TorchGenerator
+from torch import Tensor, randint
+from torch.quasirandom import SobolEngine
+
+from modugant.latents.buffered import BufferedSource
+
+_EPSILON = 1e-7
+
+
+class SobolSource[C: int, L: int](BufferedSource[C, L]):
+    '''
+    Scrambled Sobol latent source mapped to standard normals.
+
+    Quasi-random points cover the latent space more evenly than pseudo-random ones, which lowers the
+    variance of statistics estimated from bulk samples. Each point is pushed through the inverse
+    normal CDF in place.
+    '''
+
+    def __init__(self, conditions: C, latents: L, capacity: int = 0, seed: Optional[int] = None) -> None:
+        '''
+        Initialize the source.
+
+        Args:
+            conditions (C: int): The number of condition nodes.
+            latents (L: int): The number of latent nodes.
+            capacity (int): The number of rows to preallocate.
+            seed (Optional[int]): The scrambling seed; drawn from the global stream if None.
+
+        '''
+        assert latents <= SobolEngine.MAXDIM, f'Sobol sequences support at most {SobolEngine.MAXDIM} dimensions.'
+        super().__init__(conditions, latents, capacity)
+        self.__engine = SobolEngine(latents, scramble = True, seed = seed)
+    @override
+    def _noise(self, latent: Tensor, generator: Optional[TorchGenerator]) -> None:
+        engine = self.__engine
+        if generator is not None:
+            ## a per-call stream scrambles a fresh sequence instead of continuing the shared one; the seed
+            ## is drawn on the device of the stream, which may not be the host
+            seed = int(randint(2 ** 62, (1,), generator = generator, device = generator.device))
+            engine = SobolEngine(self._latents, scramble = True, seed = seed)
+        ## the engine draws on the host, the points are copied into the buffer on its device
+        _ = latent.copy_(engine.draw(latent.shape[0]))
+        _ = latent.clamp_(_EPSILON, 1 - _EPSILON).mul_(2).sub_(1).erfinv_().mul_(sqrt(2))
+    @override
+    def seed(self, seed: int) -> None:
+        self.__engine = SobolEngine(self._latents, scramble = True, seed = seed)
@@ -0,0 +1,98 @@
+'''
+Checkpointed sequential containers.
+
+Classes:
+    CheckpointedSequential: Sequential container that recomputes its segments in the backward pass.
+
+Functions:
+    sequential: Build a plain or checkpointed sequential container.
+'''
+from contextlib import contextmanager, nullcontext
+from typing import Iterator, override
+
+from torch import Tensor, is_grad_enabled
+from torch.nn import Module, Sequential
+from torch.nn.modules.batchnorm import _BatchNorm
+from torch.utils.checkpoint import checkpoint
+
+from modugant.layers.interactive import InteractionLayer
+from modugant.layers.linear.sphere import SphericalLayer
+
+
+@contextmanager
+def _frozen_stats(module: Module) -> Iterator[None]:
+    '''Restore the running statistics of every batch norm once a recomputation finishes.'''
+    stats = [
+        (buffer, buffer.clone())
+        for norm in module.modules() if isinstance(norm, _BatchNorm)
+        for buffer in (norm.running_mean, norm.running_var, norm.num_batches_tracked) if buffer is not None
+    ]
+    try:
+        yield
+    finally:
+        for (buffer, saved) in stats:
+            _ = buffer.copy_(saved)
+
+
+class CheckpointedSequential(Sequential):
+    '''
+    Sequential container that recomputes its segments in the backward pass.
+
+    Only the inputs of every segment of `every` children are kept for backward. The recomputation
+    replays the RNG state, so dropout masks match, and leaves batch norm running statistics as the
+    forward pass left them, so they are updated once per step.
+    '''
+
+    def __init__(self, *modules: Module, every: int) -> None:
+        '''
+        Initialize the checkpointed container.
+
+        Args:
+            *modules (Module): The children, run in order.
+            every (int): The number of children per checkpointed segment.
+
+        '''
+        assert every > 0, 'The segment length must be positive.'
+        super().__init__(*modules)
+        self._every = every
+        ## a recomputation must save the same tensors as the forward pass, so no weight may come from a cache
+        for module in self.modules():
+            if isinstance(module, (SphericalLayer, InteractionLayer)):
+                module.cached = False
+    @override
+    def forward(self, input: Tensor) -> Tensor:
+        if not (self._every and is_grad_enabled()):
+            return super().forward(input)
+        for start in range(0, len(self), self._every):
+            segment = Sequential(*list(self)[start:start + self._every])
+            input = checkpoint(
+                segment,
+                input,
+                use_reentrant = False,
+                context_fn = lambda segment = segment: (nullcontext(), _frozen_stats(segment))
+            )
+        return input
+    @property
+    def every(self) -> int:
+        '''Return the number of children per checkpointed segment.'''
+        return self._every
+    @every.setter
+    def every(self, every: int) -> None:
+        '''Set the number of children per checkpointed segment; 0 disables checkpointing.'''
+        assert every >= 0, 'The segment length must not be negative.'
+        self._every = every
+
+
+def sequential(*modules: Module, every: int = 0) -> Sequential:
+    '''
+    Build a sequential container, checkpointed when a segment length is given.
+
+    Args:
+        *modules (Module): The children, run in order.
+        every (int): The number of children per checkpointed segment; 0 disables checkpointing.
+
+    Returns:
+        Sequential: The container.
+
+    '''
+    return CheckpointedSequential(*modules, every = every) if every else Sequential(*modules)
@@ -0,0 +1,101 @@
+'''
+Densely connected layers.
+
+Classes:
+    DenseLayer: Chain of blocks that each read every column written before them.
+'''
+from typing import Any, Optional, Sequence, cast, override
+
+from torch import Tensor, empty, no_grad
+from torch.autograd import Function
+from torch.nn import Module, ModuleList
+
+from modugant.layers.protocol import Layer
+from modugant.matrix.matrix import Matrix
+
+
+class _Prefix(Function):
+    '''
+    Expose the leading columns of a shared buffer as a differentiable tensor.
+
+    The buffer holds a copy of every segment; the returned alias gets its own version counter so
+    that later writes to the columns past it do not invalidate the tensors saved for backward.
+    The gradient of the alias is routed back to the segments it was copied from. Leading batch
+    dimensions are kept, so the function also runs under `torch.func.vmap`.
+    '''
+
+    @staticmethod
+    @override
+    def forward(buffer: Tensor, width: int, *segments: Tensor) -> Tensor:
+        alias = empty(0, dtype = buffer.dtype, device = buffer.device)
+        shape = (*buffer.shape[:-1], width)
+        return alias.set_(buffer.untyped_storage(), buffer.storage_offset(), shape, buffer.stride())
+    @staticmethod
+    @override
+    def setup_context(ctx: Any, inputs: tuple[Any, ...], output: Any) -> None:
+        ctx.bounds = [segment.shape[-1] for segment in inputs[2:]]
+    @staticmethod
+    @override
+    def backward(ctx: Any, *grads: Tensor) -> tuple[Tensor | None, ...]:
+        (grad,) = grads
+        (routed, start) = ([], 0)
+        for (i, size) in enumerate(ctx.bounds):
+            routed.append(grad[..., start:start + size] if ctx.needs_input_grad[i + 2] else None)
+            start += size
+        return (None, None, *routed)
+    @staticmethod
+    @override
+    def vmap(info: Any, in_dims: tuple[Optional[int], ...], buffer: Tensor, width: int, *segments: Tensor) -> Any:
+        assert in_dims[0] is not None, 'The buffer of a vectorized dense layer must be batched.'
+        ## the segments are aligned on a leading batch dimension, which the alias keeps
+        batched = [
+            segment.expand(info.batch_size, *segment.shape) if dim is None else segment.movedim(dim, 0)
+            for (segment, dim) in zip(segments, in_dims[2:])
+        ]
+        return (_Prefix.apply(buffer.movedim(in_dims[0], 0), width, *batched), 0)
+
+
+class DenseLayer[I: int, O: int](Module, Layer[I, O]):
+    '''
+    Chain of blocks that each read every column written before them.
+
+    Equivalent to nesting residual layers over full-width prefixes, but all blocks write into one
+    preallocated (N, O) buffer so memory grows linearly rather than quadratically with depth.
+    '''
+
+    def __init__(self, inputs: I, blocks: Sequence[Layer[Any, Any]]) -> None:
+        '''
+        Initialize the dense layer.
+
+        Args:
+            inputs (I: int): The number of input nodes.
+            blocks (Sequence[Layer]): The blocks, each reading the input and all previous outputs.
+
+        '''
+        super().__init__()
+        self._inputs = inputs
+        self._bounds = [inputs]
+        for block in blocks:
+            self._bounds.append(self._bounds[-1] + block.dim)
+        self._dim = cast(O, self._bounds[-1])
+        self._blocks = ModuleList(cast(Sequence[Module], blocks))
+    @override
+    def forward[N: int](self, input: Matrix[N, I]) -> Matrix[N, O]:
+        buffer = input.new_empty((input.shape[0], self._dim))
+        with no_grad():
+            _ = buffer[:, :self._inputs].copy_(input)
+        segments: list[Tensor] = [input]
+        for (i, block) in enumerate(self._blocks):
+            output = block(_Prefix.apply(buffer, self._bounds[i], *segments))
+            with no_grad():
+                _ = buffer[:, self._bounds[i]:self._bounds[i + 1]].copy_(output)
+            segments.append(output)
+        return Matrix.cast(_Prefix.apply(buffer, self._dim, *segments), (input.shape[0], self._dim))
+    @property
+    def inputs(self) -> I:
+        '''Return the number of input nodes.'''
+        return self._inputs
+    @property
+    def blocks(self) -> Sequence[Module]:
+        '''Return the blocks.'''
+        return self._blocks
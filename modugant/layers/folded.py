@@ -0,0 +1,330 @@
+'''
+Folded inference layers.
+
+Classes:
+    FoldedLayer: Inference-only layer tree with its index selections folded into the weights.
+'''
+from copy import deepcopy
+from functools import partial
+from typing import Callable, Sequence, cast, override
+
+from torch import Tensor, addmm, eye, mm, no_grad, qint8, tensor, zeros
+from torch.ao.quantization import quantize_dynamic
+from torch.nn import BatchNorm1d, Dropout, LeakyReLU, Linear, Module, ModuleList, Sequential, Sigmoid
+from torch.nn.functional import batch_norm, leaky_relu_
+
+from modugant.layers.dense import DenseLayer
+from modugant.layers.interactive import InteractionLayer
+from modugant.layers.linear.linear import LinearLayer
+from modugant.layers.protocol import Layer
+from modugant.layers.residual import ResidualLayer
+from modugant.layers.subset import SubsetLayer
+from modugant.matrix.matrix import Matrix
+
+type Columns = list[int]
+
+
+def _span(columns: Columns) -> tuple[int, int] | None:
+    '''Return the bounds of the columns if they form one ascending run.'''
+    if columns and columns == list(range(columns[0], columns[0] + len(columns))):
+        return (columns[0], columns[0] + len(columns))
+    return None
+
+
+def _epilogue(module: Module) -> Callable[[Tensor], Tensor]:
+    '''Return an in-place version of an isometric module.'''
+    if isinstance(module, LeakyReLU):
+        return partial(leaky_relu_, negative_slope = module.negative_slope)
+    if isinstance(module, Sigmoid):
+        return Tensor.sigmoid_
+    if isinstance(module, BatchNorm1d) and module.track_running_stats:
+        return lambda slot: slot.copy_(
+            batch_norm(
+                slot,
+                module.running_mean,
+                module.running_var,
+                module.weight,
+                module.bias,
+                False,
+                0.0,
+                module.eps
+            )
+        )
+    return lambda slot: slot.copy_(module(slot))
+
+
+def _foldable(module: Module) -> bool:
+    '''Whether a module is a batch norm with running statistics, which is affine at inference.'''
+    return isinstance(module, BatchNorm1d) and module.running_mean is not None and module.running_var is not None
+
+
+def _fold_norm(norm: BatchNorm1d, weight: Tensor, bias: Tensor | None) -> tuple[Tensor, Tensor]:
+    '''Fold an inference batch norm into the weight and bias of the matmul it follows.'''
+    assert norm.running_mean is not None and norm.running_var is not None
+    scale = (norm.running_var + norm.eps).rsqrt()
+    if norm.weight is not None:
+        scale = scale * norm.weight
+    shift = -norm.running_mean * scale
+    if norm.bias is not None:
+        shift = shift + norm.bias
+    folded = shift if bias is None else bias.reshape(-1) * scale + shift
+    return (weight * scale, folded)
+
+
+class _Step(Module):
+    '''A single write into a slot of the feature buffer.'''
+
+    def __init__(self, slot: tuple[int, int], follow: Sequence[Module] = ()) -> None:
+        super().__init__()
+        self._slot = slot
+        self._follow = ModuleList(deepcopy(module) for module in follow)
+        self._epilogue = [_epilogue(module) for module in self._follow]
+    def _compute(self, buffer: Tensor, out: Tensor) -> None:
+        ...
+    @override
+    def forward(self, buffer: Tensor) -> None:
+        out = buffer[:, self._slot[0]:self._slot[1]]
+        self._compute(buffer, out)
+        for epilogue in self._epilogue:
+            _ = epilogue(out)
+
+
+class _Dense(_Step):
+    '''A linear layer reading a contiguous window of the buffer.'''
+
+    def __init__(
+        self,
+        window: tuple[int, int],
+        slot: tuple[int, int],
+        weight: Tensor,
+        bias: Tensor | None,
+        follow: Sequence[Module] = (),
+        finish: Sequence[Callable[[Tensor], Tensor]] = ()
+    ) -> None:
+        super().__init__(slot, follow)
+        self._window = window
+        self._linear = Linear(weight.shape[0], weight.shape[1], bias = bias is not None)
+        self._finish = list(finish)
+        with no_grad():
+            _ = self._linear.weight.copy_(weight.T)
+            if bias is not None:
+                _ = self._linear.bias.copy_(bias.reshape(-1))
+    @override
+    def _compute(self, buffer: Tensor, out: Tensor) -> None:
+        window = buffer[:, self._window[0]:self._window[1]]
+        if not isinstance(self._linear, Linear):
+            ## a quantized linear cannot write into the slot, its output is copied there
+            _ = out.copy_(self._linear(window))
+        elif self._linear.bias is None:
+            _ = mm(window, self._linear.weight.T, out = out)
+        else:
+            _ = addmm(self._linear.bias, window, self._linear.weight.T, out = out)
+    @override
+    def forward(self, buffer: Tensor) -> None:
+        super().forward(buffer)
+        out = buffer[:, self._slot[0]:self._slot[1]]
+        for finish in self._finish:
+            _ = out.copy_(finish(out))
+
+
+class _Interaction(_Step):
+    '''An interaction layer computed as one matmul over its blocks and its right selection.'''
+
+    def __init__(
+        self,
+        window: tuple[int, int],
+        slot: tuple[int, int],
+        weight: Tensor,
+        bias: Tensor,
+        blocks: int
+    ) -> None:
+        super().__init__(slot)
+        self._window = window
+        self._blocks = blocks
+        self._linear = Linear(weight.shape[0], weight.shape[1])
+        with no_grad():
+            _ = self._linear.weight.copy_(weight.T)
+            _ = self._linear.bias.copy_(bias)
+    @override
+    def _compute(self, buffer: Tensor, out: Tensor) -> None:
+        window = buffer[:, self._window[0]:self._window[1]]
+        terms = addmm(self._linear.bias, window, self._linear.weight.T)
+        (count, dim) = (buffer.shape[0], out.shape[1])
+        _ = out.copy_(terms[:, :self._blocks * dim].view(count, self._blocks, dim).prod(dim = 1))
+        _ = out.add_(terms[:, self._blocks * dim:])
+
+
+class _Isometric(_Step):
+    '''A standalone isometric layer copied into a fresh slot.'''
+
+    _columns: Tensor
+    def __init__(self, columns: Columns, slot: tuple[int, int], module: Module) -> None:
+        super().__init__(slot, [module])
+        self._span = _span(columns)
+        self.register_buffer('_columns', tensor(columns))
+    @override
+    def _compute(self, buffer: Tensor, out: Tensor) -> None:
+        if self._span is None:
+            _ = out.copy_(buffer[:, self._columns])
+        else:
+            _ = out.copy_(buffer[:, self._span[0]:self._span[1]])
+
+
+class _Folder:
+    '''Walk a layer tree, tracking the buffer columns behind every intermediate output.'''
+
+    def __init__(self, width: int) -> None:
+        self.width = width
+        self.steps: list[_Step] = []
+    def _allocate(self, dim: int) -> tuple[int, int]:
+        slot = (self.width, self.width + dim)
+        self.width += dim
+        return slot
+    def _scatter(self, columns: Columns, weight: Tensor) -> tuple[tuple[int, int], Tensor]:
+        '''Scatter the rows of a weight onto the window of the buffer holding its columns.'''
+        window = (min(columns), max(columns) + 1)
+        scattered = weight.new_zeros((window[1] - window[0], weight.shape[1]))
+        _ = scattered.index_add_(0, tensor([column - window[0] for column in columns], device = weight.device), weight)
+        return (window, scattered)
+    def fold(self, layer: Module, columns: Columns) -> Columns:
+        '''Fold a layer reading the given buffer columns, returning the columns of its output.'''
+        if isinstance(layer, Sequential):
+            for module in layer:
+                columns = self.fold(module, columns)
+            return columns
+        if isinstance(layer, DenseLayer):
+            for block in layer.blocks:
+                columns = columns + self.fold(block, columns)
+            return columns
+        if isinstance(layer, ResidualLayer):
+            subset = [columns[i] for i in layer.index]
+            return subset + self.fold(cast(Module, layer.layer), subset)
+        if isinstance(layer, SubsetLayer):
+            return self.fold(cast(Module, layer.layer), [columns[i] for i in layer.index])
+        if isinstance(layer, LinearLayer):
+            return self._linear(layer, columns)
+        if isinstance(layer, InteractionLayer):
+            return self._interaction(layer, columns)
+        if isinstance(layer, Dropout):
+            return columns
+        if isinstance(layer, (LeakyReLU, Sigmoid, BatchNorm1d)):
+            slot = self._allocate(len(columns))
+            self.steps.append(_Isometric(columns, slot, layer))
+            return list(range(*slot))
+        raise TypeError(f'Cannot fold layer of type {type(layer).__name__}.')
+    def _linear(self, layer: LinearLayer[int, int, int], columns: Columns) -> Columns:
+        if type(layer)._prepare is not LinearLayer._prepare:
+            raise TypeError(f'Cannot fold the custom prepare of {type(layer).__name__}.')
+        finish = [layer._finish] if type(layer)._finish is not LinearLayer._finish else []
+        (window, weight) = self._scatter([columns[i] for i in layer.index], layer.weight.detach())
+        bias = None if layer.bias is None else layer.bias.detach()
+        ## batch norms ahead of any activation fold into the weight, dropout is dropped
+        follow: list[Module] = []
+        for module in layer.follow:
+            if isinstance(module, Dropout):
+                continue
+            if not follow and _foldable(module):
+                (weight, bias) = _fold_norm(cast(BatchNorm1d, module), weight, bias)
+                continue
+            follow.append(module)
+        slot = self._allocate(layer.dim)
+        self.steps.append(_Dense(window, slot, weight, bias, follow, finish))
+        return list(range(*slot))
+    def _interaction(self, layer: InteractionLayer[int, int], columns: Columns) -> Columns:
+        (weight, bias, dim) = (layer.weight.detach(), layer.bias.detach(), layer.dim)
+        ## one column block per left index followed by the identity block of the right selection
+        selected = [columns[i] for index in layer.left for i in index] + [columns[i] for i in layer.right]
+        rows = zeros((len(selected), (len(layer.left) + 1) * dim), dtype = weight.dtype, device = weight.device)
+        offset = 0
+        for (k, index) in enumerate(layer.left):
+            rows[offset:offset + index.dim, k * dim:(k + 1) * dim] = weight[k, :index.dim]
+            offset += index.dim
+        rows[offset:, len(layer.left) * dim:] = eye(dim, dtype = weight.dtype, device = weight.device)
+        (window, scattered) = self._scatter(selected, rows)
+        slot = self._allocate(dim)
+        flat = bias.new_zeros(((len(layer.left) + 1) * dim,))
+        flat[:len(layer.left) * dim] = bias.reshape(-1)
+        self.steps.append(_Interaction(window, slot, scattered, flat, len(layer.left)))
+        return list(range(*slot))
+
+
+class FoldedLayer[I: int, O: int](Module, Layer[I, O]):
+    '''
+    Inference-only layer tree with its index selections folded into the weights.
+
+    Every selection is scattered into the rows of the consuming weight matrix and every residual
+    concatenation writes into one preallocated feature buffer, so the forward pass runs as plain
+    matmuls with in-place activations. Batch norms directly after a matmul fold into its weight with
+    their running statistics and dropout is dropped. The weights are a snapshot taken when the tree
+    is folded, so spherical weights are normalized once.
+    '''
+
+    _output: Tensor
+    def __init__(self, inputs: I, layer: Layer[I, O]) -> None:
+        '''
+        Fold a layer tree.
+
+        Args:
+            inputs (I: int): The number of input nodes.
+            layer (Layer[I, O]): The layer tree to fold.
+
+        '''
+        super().__init__()
+        folder = _Folder(inputs)
+        with no_grad():
+            columns = folder.fold(cast(Module, layer), list(range(inputs)))
+        self._inputs = inputs
+        self._dim = cast(O, len(columns))
+        self._width = folder.width
+        self._steps = ModuleList(folder.steps)
+        self._span = _span(columns)
+        self.register_buffer('_output', tensor(columns))
+    def _run(self, buffer: Tensor) -> Tensor:
+        '''Run every step on a buffer holding the input, returning the output columns.'''
+        for step in self._steps:
+            step(buffer)
+        if self._span is None:
+            return buffer[:, self._output]
+        return buffer[:, self._span[0]:self._span[1]].contiguous()
+    @override
+    def forward[N: int](self, input: Matrix[N, I]) -> Matrix[N, O]:
+        with no_grad():
+            buffer = input.new_empty((input.shape[0], self._width))
+            _ = buffer[:, :self._inputs].copy_(input)
+            output = self._run(buffer)
+        return Matrix.cast(output, (input.shape[0], self._dim))
+    def forward_parts[N: int](self, parts: Sequence[Matrix[N, int]]) -> Matrix[N, O]:
+        '''
+        Forward pass on an input given as column blocks, written straight into the feature buffer.
+
+        Args:
+            parts (Sequence[Matrix[N, int]]): The column blocks of the input, in order.
+
+        Returns:
+            Matrix[N, O]: The output.
+
+        '''
+        assert sum(part.shape[1] for part in parts) == self._inputs, 'The parts do not match the input.'
+        with no_grad():
+            buffer = parts[0].new_empty((parts[0].shape[0], self._width))
+            start = 0
+            for part in parts:
+                _ = buffer[:, start:start + part.shape[1]].copy_(part)
+                start += part.shape[1]
+            output = self._run(buffer)
+        return Matrix.cast(output, (parts[0].shape[0], self._dim))
+    def quantize(self) -> 'FoldedLayer[I, O]':
+        '''
+        Quantize the matmuls of the linear layers for CPU inference.
+
+        Returns:
+            FoldedLayer[I, O]: A CPU copy whose linear weights are int8, with activations quantized
+                dynamically per batch. Interaction layers keep float weights.
+
+        '''
+        names = {f'{name}._linear' for (name, step) in self.named_modules() if isinstance(step, _Dense)}
+        return quantize_dynamic(deepcopy(self).cpu(), names, dtype = qint8)
+    @property
+    def width(self) -> int:
+        '''Return the width of the feature buffer.'''
+        return self._width
@@ -1,17 +1,26 @@
-from typing import Sequence, override
+from math import sqrt
+from typing import Any, Dict, Optional, Sequence, Tuple, override
 
-from torch.nn import Module
+from torch import Tensor, baddbmm, empty, no_grad, tensor
+from torch.nn import Module, Parameter
 
-from modugant.layers.linear.sphere import SphericalLayer
+from modugant.layers.linear.sphere import Stamp, stamp
 from modugant.layers.protocol import Layer
 from modugant.matrix.index import Index
 from modugant.matrix.matrix import Matrix
-from modugant.matrix.ops import products
 
 
 class InteractionLayer[I: int, O: int](Module, Layer[I, O]):
-    '''Linear layer with interactive weights.'''
+    '''
+    Linear layer with interactive weights.
 
+    Every left index holds a spherical weight block; the blocks are packed into one zero-padded
+    (K, L, O) tensor so all interaction terms are computed with a single batched matmul. The normalized
+    blocks are cached as the weight of a spherical layer is.
+    '''
+
+    _gather: Tensor
+    _mask: Tensor
     def __init__(
         self,
         left: Sequence[Index[int, I]],
@@ -26,9 +35,76 @@ class InteractionLayer[I: int, O: int](Module, Layer[I, O]):
 
         '''
         super().__init__()
+        self._dim = right.dim
         self._left = left
         self._right = right
-        self._layers = [SphericalLayer(right.dim, index) for index in left]
+        width = max(index.dim for index in left)
+        ## padded positions gather column 0 and are masked out of the weights
+        self.register_buffer(
+            '_gather',
+            tensor([[*index, *([0] * (width - index.dim))] for index in left])
+        )
+        self.register_buffer(
+            '_mask',
+            tensor([[[1.0]] * index.dim + [[0.0]] * (width - index.dim) for index in left])
+        )
+        self._weight = Parameter(empty((len(left), width, right.dim)))
+        self._bias = Parameter(empty((len(left), 1, right.dim)))
+        self.__cache: Optional[Tuple[Stamp, Tensor]] = None
+        self.__cached = True
+        self.reset_parameters()
+    def __release(self, _: Tensor) -> None:
+        '''Drop the cached weight once a backward pass has gone through it.'''
+        self.__cache = None
+    @override
+    def __getstate__(self) -> Dict[str, Any]:
+        state = dict(super().__getstate__())
+        ## the cached weight may carry an autograd graph, it is never copied
+        state['_InteractionLayer__cache'] = None
+        return state
+    def reset_parameters(self) -> None:
+        '''Reinitialize the weight blocks and the biases.'''
+        with no_grad():
+            for (k, index) in enumerate(self._left):
+                _ = self._weight[k].normal_(mean = 0.0, std = 2 / sqrt(index.dim))
+            _ = self._bias.zero_()
+    @property
+    def left(self) -> Sequence[Index[int, I]]:
+        '''Return the left indices.'''
+        return self._left
+    @property
+    def right(self) -> Index[O, I]:
+        '''Return the right index.'''
+        return self._right
+    @property
+    def bias(self) -> Tensor:
+        '''Return the (K, 1, O) stack of biases.'''
+        return self._bias
+    @property
+    def weight(self) -> Tensor:
+        '''Return the (K, L, O) stack of normalized weight blocks.'''
+        if not self.__cached:
+            weight = self._weight * self._mask
+            return weight / weight.norm(dim = 1, keepdim = True)
+        current = stamp(self._weight)
+        if self.__cache is None or self.__cache[0] != current:
+            weight = self._weight * self._mask
+            normalized = weight / weight.norm(dim = 1, keepdim = True)
+            if normalized.requires_grad:
+                _ = normalized.register_hook(self.__release)
+            self.__cache = (current, normalized)
+        return self.__cache[1]
+    @property
+    def cached(self) -> bool:
+        '''Return whether the normalized weight is cached.'''
+        return self.__cached
+    @cached.setter
+    def cached(self, cached: bool) -> None:
+        self.__cached = cached
+        self.__cache = None
     @override
     def forward[N: int](self, input: Matrix[N, I]) -> Matrix[N, O]:
-        return input[..., self._right] + products(tuple(layer.forward(input) for layer in self._layers))
+        ## (K, N, L) view of the gathered columns for every left index
+        gathered = input.T[self._gather].transpose(1, 2)
+        terms = baddbmm(self._bias, gathered, self.weight)
+        return input[..., self._right] + Matrix.cast(terms.prod(dim = 0), (input.shape[0], self._dim))
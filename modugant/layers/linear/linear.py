@@ -1,18 +1,20 @@
 from math import sqrt
-from typing import Optional, Sequence, override
+from typing import Optional, Sequence, cast, override
 
-from torch.nn import Module
+from torch import addmm, empty, no_grad
+from torch.nn import Module, ModuleList, Parameter
 
 from modugant.layers.protocol import Layer
-from modugant.matrix.dim import Dim
+from modugant.matrix.dim import Dim, One
 from modugant.matrix.index import Index
 from modugant.matrix.matrix import Matrix
-from modugant.matrix.ops import normal, zeros
+from modugant.matrix.ops import zeros
 
 
 class LinearLayer[I: int, D: int, O: int](Module, Layer[I, O]):
     '''Abstract linear layer for a neural network.'''
 
+    _bias: Optional[Parameter]
     def __init__(
         self,
         dim: O,
@@ -33,28 +35,78 @@ class LinearLayer[I: int, D: int, O: int](Module, Layer[I, O]):
         super().__init__()
         self._dim = dim
         self._index = index
-        self._weight = normal(
-            mean = 0.0,
-            std = 2 / (sqrt(index.dim)),
-            shape = (index.dim, dim),
-            requires_grad = True
-        )
-        self._bias = zeros((Dim.one(), dim), requires_grad = bias)
-        self._follow = follow or []
+        ## an identity index selects the whole input, so the gather can be skipped
+        self._identity = index.identity
+        self._weight = Parameter(empty((index.dim, dim)))
+        self._bias = Parameter(zeros((Dim.one(), dim))) if bias else None
+        self._follow = ModuleList(cast(Sequence[Module], follow or []))
+        self.reset_parameters()
+    def reset_parameters(self) -> None:
+        '''Reinitialize the weight matrix and the bias.'''
+        with no_grad():
+            _ = self._weight.normal_(mean = 0.0, std = 2 / sqrt(self._index.dim))
+            if self._bias is not None:
+                _ = self._bias.zero_()
     def _prepare[N: int](self, output: Matrix[N, O]) -> Matrix[N, O]:
         '''Finish the forward pass of the linear transformation.'''
         return output
     def _finish[N: int](self, output: Matrix[N, O]) -> Matrix[N, O]:
         '''Finish the forward pass of the linear transformation.'''
         return output
+    def _complete[N: int](self, transform: Matrix[N, O]) -> Matrix[N, O]:
+        '''Run the affine output through the prepare step, the following layers and the finish step.'''
+        transform = self._prepare(transform)
+        for layer in self._follow:
+            transform = Matrix.cast(layer(transform), (transform.shape[0], self._dim))
+        return self._finish(transform)
     @override
     def forward[N: int](self, input: Matrix[N, I]) -> Matrix[N, O]:
         '''Forward pass of the linear transformation.'''
-        transform = self._prepare(input[..., self._index] @ self.weight + self._bias)
-        for layer in self._follow:
-            transform = layer.forward(transform)
-        return self._finish(transform)
+        shape = (input.shape[0], self._dim)
+        selected = input if self._identity else input[..., self._index]
+        if self._bias is None:
+            transform = selected @ self.weight
+        else:
+            transform = Matrix.cast(addmm(self._bias, selected, self.weight), shape)
+        return self._complete(transform)
+    def forward_parts[N: int](self, parts: Sequence[Matrix[N, int]]) -> Matrix[N, O]:
+        '''
+        Forward pass on an input given as column blocks, without concatenating them.
+
+        Every block is multiplied by its own row block of the weight and accumulated in place,
+        which requires the index to select the whole input in order.
+
+        Args:
+            parts (Sequence[Matrix[N, int]]): The column blocks of the input, in order.
+
+        Returns:
+            Matrix[N, O]: The output.
+
+        '''
+        assert self._identity, 'Only a layer reading its whole input can take it in parts.'
+        assert sum(part.shape[1] for part in parts) == self._index.dim, 'The parts do not match the input.'
+        shape = (parts[0].shape[0], self._dim)
+        blocks = self.weight.split([part.shape[1] for part in parts])
+        if self._bias is None:
+            transform = parts[0] @ blocks[0]
+        else:
+            transform = addmm(self._bias, parts[0], blocks[0])
+        for (part, block) in zip(parts[1:], blocks[1:]):
+            transform = transform.addmm_(part, block)
+        return self._complete(Matrix.cast(transform, shape))
+    @property
+    def index(self) -> Index[D, I]:
+        '''Return the input index.'''
+        return self._index
+    @property
+    def follow(self) -> Sequence[Module]:
+        '''Return the following layers.'''
+        return self._follow
     @property
     def weight(self) -> Matrix[D, O]:
         '''Return the weight matrix.'''
-        return self._weight
+        return Matrix.cast(self._weight, (self._index.dim, self._dim))
+    @property
+    def bias(self) -> Optional[Matrix[One, O]]:
+        '''Return the bias row, if the layer has one.'''
+        return None if self._bias is None else Matrix.cast(self._bias, (Dim.one(), self._dim))
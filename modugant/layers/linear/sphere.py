@@ -1,4 +1,6 @@
-from typing import Optional, Sequence, override
+from typing import Any, Dict, Optional, Sequence, Tuple, override
+
+from torch import Tensor, is_grad_enabled, is_inference_mode_enabled
 
 from modugant.layers.linear.linear import LinearLayer
 from modugant.layers.protocol import Layer
@@ -6,9 +8,26 @@ from modugant.matrix.index import Index
 from modugant.matrix.matrix import Matrix
 from modugant.matrix.ops import norm
 
+type Stamp = Tuple[int, int, bool, bool]
+
+
+def stamp(weight: Tensor) -> Stamp:
+    '''Identify the current state of a weight parameter and the autograd mode.'''
+    return (
+        weight._version, # pyright: ignore[reportPrivateUsage]
+        weight.data_ptr(),
+        is_grad_enabled(),
+        is_inference_mode_enabled()
+    )
+
 
 class SphericalLayer[I: int, L: int, O: int](LinearLayer[I, L, O]):
-    '''Linear layer with weights on the unit sphere.'''
+    '''
+    Linear layer with weights on the unit sphere.
+
+    The normalized weight is cached until the parameter is stepped or moved (version counter, data pointer),
+    or until a backward pass has consumed the graph it was built in.
+    '''
 
     def __init__(
         self,
@@ -28,8 +47,37 @@ class SphericalLayer[I: int, L: int, O: int](LinearLayer[I, L, O]):
 
         '''
         super().__init__(dim, index, follow, bias)
+        self.__cache: Optional[Tuple[Stamp, Matrix[L, O]]] = None
+        self.__cached = True
+    def __release(self, _: Tensor) -> None:
+        '''Drop the cached weight once a backward pass has gone through it.'''
+        self.__cache = None
+    @override
+    def __getstate__(self) -> Dict[str, Any]:
+        state = dict(super().__getstate__())
+        ## the cached weight may carry an autograd graph, it is never copied
+        state['_SphericalLayer__cache'] = None
+        return state
     @property
     @override
     def weight(self) -> Matrix[L, O]:
         '''Return the weight matrix.'''
-        return self._weight / norm(self._weight, dim = 0)
+        if not self.__cached:
+            weight = super().weight
+            return weight / norm(weight, dim = 0)
+        current = stamp(self._weight)
+        if self.__cache is None or self.__cache[0] != current:
+            weight = super().weight
+            normalized = weight / norm(weight, dim = 0)
+            if normalized.requires_grad:
+                _ = normalized.register_hook(self.__release)
+            self.__cache = (current, normalized)
+        return self.__cache[1]
+    @property
+    def cached(self) -> bool:
+        '''Return whether the normalized weight is cached.'''
+        return self.__cached
+    @cached.setter
+    def cached(self, cached: bool) -> None:
+        self.__cached = cached
+        self.__cache = None
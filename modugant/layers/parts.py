@@ -0,0 +1,42 @@
+'''
+Forward passes on inputs given as column blocks.
+
+Functions:
+    forward_parts: Run a model on the concatenation of column blocks without building it.
+'''
+from typing import Sequence
+
+from torch import Tensor, cat
+from torch.nn import Module, Sequential
+
+from modugant.layers.folded import FoldedLayer
+from modugant.layers.linear.linear import LinearLayer
+
+
+def forward_parts(model: Module, parts: Sequence[Tensor]) -> Tensor:
+    '''
+    Run a model on the concatenation of column blocks without building it.
+
+    When the model starts with a linear layer reading its whole input, each block is multiplied by its
+    own slice of the first weight, and a folded layer writes the blocks into its feature buffer;
+    otherwise the blocks are concatenated.
+
+    Args:
+        model (Module): The model.
+        parts (Sequence[Tensor]): The column blocks of the input, in order.
+
+    Returns:
+        Tensor: The output of the model.
+
+    '''
+    if isinstance(model, FoldedLayer):
+        return model.forward_parts(parts)
+    (first, rest) = (model, list[Module]())
+    if type(model) is Sequential and len(model) > 0:
+        (first, rest) = (model[0], list(model)[1:])
+    if not (isinstance(first, LinearLayer) and first.index.identity):
+        return model(cat(tuple(parts), dim = 1))
+    output = first.forward_parts(parts)
+    for module in rest:
+        output = module(output)
+    return output
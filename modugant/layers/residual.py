@@ -39,3 +39,11 @@ class ResidualLayer[I: int, S: int, L: int, O: int](Module, Layer[I, O]):
             dim = 1,
             shape = (input.shape[0], self._dim)
         )
+    @property
+    def index(self) -> Index[S, I]:
+        '''Return the index of the carried input.'''
+        return self._index
+    @property
+    def layer(self) -> Layer[S, L]:
+        '''Return the residual layer.'''
+        return self._layer
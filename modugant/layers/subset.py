@@ -25,9 +25,18 @@ class SubsetLayer[I: int, S: int, O: int](Module, Layer[I, O]):
             layer (Layer[S, O]): The following layer.
 
         '''
+        super().__init__()
         self._dim = dim
         self._index = index
         self._layer = layer
     @override
     def forward[N: int](self, input: Matrix[N, I]) -> Matrix[N, O]:
         return self._layer.forward(input[..., self._index])
+    @property
+    def index(self) -> Index[S, I]:
+        '''Return the index of the selected input.'''
+        return self._index
+    @property
+    def layer(self) -> Layer[S, O]:
+        '''Return the following layer.'''
+        return self._layer
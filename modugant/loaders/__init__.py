@@ -1,4 +1,5 @@
 from .composed import ComposedLoader
+from .keyed import KeyIndex
 from .protocol import Loader
 
-__all__ = ['ComposedLoader', 'Loader']
+__all__ = ['ComposedLoader', 'KeyIndex', 'Loader']
@@ -1,8 +1,9 @@
-from typing import Self, override
+from typing import Optional, Self, Sequence, override
 
 from modugant.device import Device, check_device
 from modugant.loaders.connectors.composed import ComposedPreConnector
 from modugant.loaders.connectors.protocol import Connector
+from modugant.loaders.keyed import KeyIndex
 from modugant.loaders.protocol import Loader
 from modugant.loaders.samplers.protocol import Sampler
 from modugant.matrix.matrix import Matrix
@@ -24,7 +25,8 @@ class ComposedLoader[S: int, C: int, D: int](ComposedPreConnector[S, C, D], Load
         data: Matrix[int, int],
         sampler: Sampler,
         connector: Connector[S, C, D],
-        device: Device = 'cpu'
+        device: Device = 'cpu',
+        keys: Optional[Sequence[int]] = None
     ) -> None:
         '''
         Initialize the composed loader.
@@ -34,6 +36,7 @@ class ComposedLoader[S: int, C: int, D: int](ComposedPreConnector[S, C, D], Load
             sampler (Sampler): The sampler.
             connector (Connector): The connector.
             device (Device): The device.
+            keys (Optional[Sequence[int]]): The raw columns indexed for conditional sampling.
 
         '''
         super().__init__(connector, connector)
@@ -41,6 +44,7 @@ class ComposedLoader[S: int, C: int, D: int](ComposedPreConnector[S, C, D], Load
         self._sampler = sampler
         self._connector = connector
         self._device = check_device(device)
+        self._keys = None if keys is None else KeyIndex(data, keys)
     @override
     def sample[N: int](self, batch: N) -> Matrix[N, S]:
         '''Sample the data.'''
@@ -48,6 +52,16 @@ class ComposedLoader[S: int, C: int, D: int](ComposedPreConnector[S, C, D], Load
         transformed = self._connector.load(self.__data[sample, ...])
         return transformed.to(self._device)
     @override
+    def sample_where(self, keys: Matrix[int, int], k: int) -> Matrix[int, S]:
+        '''Sample the data among the rows holding given keys.'''
+        assert self._keys is not None, 'Conditional sampling needs the loader to index its key columns.'
+        transformed = self._connector.load(self.__data[self._keys.sample(keys, k)])
+        return transformed.to(self._device)
+    @override
+    def unload[N: int](self, data: Matrix[N, D]) -> Matrix[N, int]:
+        '''Decode generated data back to the raw space.'''
+        return self._connector.unload(data)
+    @override
     def restart(self) -> None:
         '''Restart the loader.'''
         self._sampler.restart()
@@ -56,6 +70,14 @@ class ComposedLoader[S: int, C: int, D: int](ComposedPreConnector[S, C, D], Load
         '''Move the transformer to the device.'''
         self._device = device
         return self
+    @property
+    def connector(self) -> Connector[S, C, D]:
+        '''The connector.'''
+        return self._connector
+    @property
+    def keys(self) -> Optional[KeyIndex]:
+        '''The index of the key columns.'''
+        return self._keys
     @override
     def update(self) -> None:
         '''Update the loader.'''
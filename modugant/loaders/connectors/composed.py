@@ -73,12 +73,9 @@ class ComposedConnector[S: int, C: int, D: int](ComposedPreConnector[S, C, D], C
             interceptor (Interceptor[C, D]): The interceptor.
 
         '''
+        super().__init__(splitter, interceptor)
         self._samples = transformer._samples
-        self._conditions = splitter._conditions
-        self._outputs = interceptor._outputs
         self.__transformer = transformer
-        self.__splitter = splitter
-        self.__interceptor = interceptor
     @override
     def load[N: int](self, data: Matrix[N, Any]) -> Matrix[N, S]:
         return self.__transformer.load(data)
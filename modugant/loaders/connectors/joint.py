@@ -43,63 +43,43 @@ class JointPreConnector[S: int, C: int, D: int](PreConnector[S, C, D]):
             (sum(sizes[0][:i]), sum(sizes[1][:i]), sum(sizes[2][:i]))
             for i in range(len(connectors))
         ]
+        self._backmap = [
+            (
+                Index.slice(s_offset, sizes[0][i], samples),
+                Index.slice(c_offset, sizes[1][i], conditions),
+                Index.slice(d_offset, sizes[2][i], outputs)
+            )
+            for (i, (s_offset, c_offset, d_offset)) in enumerate(self._map)
+        ]
     def __getitem__(self, index: int) -> PreConnector[int, int, int]:
         '''Get the Connector at the given index.'''
         return self._connectors[index]
     @override
     def condition[N: int](self, data: Matrix[N, S]) -> Matrix[N, C]:
         conditioned = tuple(
-            self._connectors[i].condition(
-                data[
-                    ...,
-                    Index.slice(self._map[i][0], self._connectors[i].samples, self._samples)
-                ]
-            )
-            for i in range(len(self._connectors))
+            self._connectors[i].condition(data[..., s_index])
+            for (i, (s_index, _, _)) in enumerate(self._backmap)
         )
         return cat(conditioned, dim=1, shape=(data.shape[0], self._conditions))
     @override
     def prepare[N: int](self, data: Matrix[N, S]) -> Matrix[N, D]:
         prepared = tuple(
-            self._connectors[i].prepare(
-                data[
-                    ...,
-                    Index.slice(self._map[i][0], self._connectors[i].samples, self._samples)
-                ]
-            )
-            for i in range(len(self._connectors))
+            self._connectors[i].prepare(data[..., s_index])
+            for (i, (s_index, _, _)) in enumerate(self._backmap)
         )
         return cat(prepared, dim=1, shape=(data.shape[0], self._outputs))
     @override
     def intercept[N: int](self, condition: Matrix[N, C], intermediate: Matrix[N, D]) -> Matrix[N, D]:
         intercepted = tuple(
-            self._connectors[i].intercept(
-                condition[
-                    ...,
-                    Index.slice(self._map[i][1], self._connectors[i].conditions, self._conditions)
-                ],
-                intermediate[
-                    ...,
-                    Index.slice(self._map[i][2], self._connectors[i].outputs, self._outputs)
-                ]
-            )
-            for i in range(len(self._connectors))
+            self._connectors[i].intercept(condition[..., c_index], intermediate[..., d_index])
+            for (i, (_, c_index, d_index)) in enumerate(self._backmap)
         )
         return cat(intercepted, dim=1, shape=(condition.shape[0], self._outputs))
     @override
     def loss[N: int](self, condition: Matrix[N, C], intermediate: Matrix[N, D]) -> Matrix[One, One]:
         losses = tuple(
-            self._connectors[i].loss(
-                condition[
-                    ...,
-                    Index.slice(self._map[i][1], self._connectors[i].conditions, self._conditions)
-                ],
-                intermediate[
-                    ...,
-                    Index.slice(self._map[i][2], self._connectors[i].outputs, self._outputs)
-                ]
-            )
-            for i in range(len(self._connectors))
+            self._connectors[i].loss(condition[..., c_index], intermediate[..., d_index])
+            for (i, (_, c_index, d_index)) in enumerate(self._backmap)
         )
         return sums(losses)
     @override
@@ -139,12 +119,7 @@ class JointConnector[S: int, C: int, D: int](JointPreConnector[S, C, D], Connect
     @override
     def unload[N: int](self, data: Matrix[N, D]) -> Matrix[N, S]:
         unloaded = tuple(
-            self._connectors[i].unload(
-                data[
-                    ...,
-                    Index.slice(self._map[i][2], self._connectors[i].outputs, self._outputs)
-                ]
-            )
-            for i in range(len(self._connectors))
+            self._connectors[i].unload(data[..., d_index])
+            for (i, (_, _, d_index)) in enumerate(self._backmap)
         )
         return cat(unloaded, dim=1, shape=(data.shape[0], self._samples))
@@ -16,7 +16,7 @@ class PooledTransformer[S: int](Transformer[S]):
         self._samples = dim
         self._transformers = transformers
         self.__backmap = [
-            sum(sizes[:i])
+            Index.slice(sum(sizes[:i]), sizes[i], dim)
             for i in range(len(transformers))
         ]
     def __getitem__(self, index: int) -> Transformer[int]:
@@ -34,12 +34,7 @@ class PooledTransformer[S: int](Transformer[S]):
     def unload[N: int](self, data: Matrix[N, S]) -> Matrix[N, Any]:
         '''Revert to underlying data.'''
         unloaded = tuple(
-            self._transformers[i].unload(
-                data[
-                    ...,
-                    Index.slice(self.__backmap[i], self._transformers[i].samples, self._samples)
-                ]
-            )
-            for i in range(len(self._transformers))
+            self._transformers[i].unload(data[..., index])
+            for (i, index) in enumerate(self.__backmap)
         )
         return cat(unloaded, dim = 1, shape = (data.shape[0], self._samples))
@@ -0,0 +1,104 @@
+'''
+Row indices over the key columns of the raw data.
+
+Classes:
+    KeyIndex: Compressed map from every distinct key to the rows holding it.
+'''
+from typing import Sequence
+
+from torch import Tensor, argsort, cat, float64, rand, unique, zeros
+
+from modugant.matrix.matrix import Matrix
+
+
+class KeyIndex:
+    '''
+    Compressed map from every distinct key to the rows holding it.
+
+    The row ids are sorted by key, so the rows of key `i` are the slice `rows[offsets[i]:offsets[i + 1]]`
+    and drawing from any set of keys costs one gather, whatever their frequency.
+    '''
+
+    def __init__(self, data: Matrix[int, int], columns: Sequence[int]) -> None:
+        '''
+        Build the index.
+
+        Args:
+            data (Matrix[int, int]): The raw data.
+            columns (Sequence[int]): The key columns.
+
+        '''
+        assert len(columns) > 0, 'The index needs at least one key column.'
+        keys = data[:, list(columns)]
+        (distinct, inverse, counts) = unique(keys, dim = 0, return_inverse = True, return_counts = True)
+        self._columns = tuple(columns)
+        self._rows = argsort(inverse, stable = True)
+        self._offsets = cat([zeros(1, dtype = counts.dtype, device = counts.device), counts.cumsum(0)])
+        self._counts = counts
+        self._lookup = {tuple(key): i for (i, key) in enumerate(distinct.tolist())}
+    def find(self, keys: Matrix[int, int]) -> Tensor:
+        '''
+        Find the position of keys in the index.
+
+        Args:
+            keys (Matrix[M, K]): The keys, one row per key, in the order of the key columns.
+
+        Returns:
+            Tensor (M,): The position of every key.
+
+        Raises:
+            KeyError: If a key does not occur in the data.
+
+        '''
+        assert keys.shape[1] == len(self._columns), 'Every key needs a value per key column.'
+        return self._rows.new_tensor([self._lookup[tuple(key)] for key in keys.tolist()])
+    def count(self, keys: Matrix[int, int]) -> Tensor:
+        '''
+        Count the rows holding keys.
+
+        Args:
+            keys (Matrix[M, K]): The keys.
+
+        Returns:
+            Tensor (M,): The number of rows holding every key.
+
+        '''
+        return self._counts[self.find(keys)]
+    def rows(self, keys: Matrix[int, int]) -> Tensor:
+        '''
+        Return every row holding one of the keys.
+
+        Args:
+            keys (Matrix[M, K]): The keys.
+
+        Returns:
+            Tensor (R,): The row ids, grouped by key in the order of the keys.
+
+        '''
+        return cat([self._rows[self._offsets[i]:self._offsets[i + 1]] for i in self.find(keys).tolist()])
+    def sample(self, keys: Matrix[int, int], k: int) -> Tensor:
+        '''
+        Draw rows uniformly with replacement among the rows holding every key.
+
+        Args:
+            keys (Matrix[M, K]): The keys.
+            k (int): The number of rows drawn for every key.
+
+        Returns:
+            Tensor (M * k,): The row ids, `k` consecutive rows per key.
+
+        '''
+        found = self.find(keys)
+        starts = self._offsets[found].repeat_interleave(k)
+        sizes = self._counts[found].repeat_interleave(k)
+        ## float64 keeps the offsets exact for large groups, the clamp guards the rounding at the top
+        picks = (rand(len(sizes), dtype = float64, device = sizes.device) * sizes).long().clamp_max(sizes - 1)
+        return self._rows[starts + picks]
+    @property
+    def columns(self) -> tuple[int, ...]:
+        '''The key columns.'''
+        return self._columns
+    @property
+    def size(self) -> int:
+        '''The number of distinct keys.'''
+        return len(self._counts)
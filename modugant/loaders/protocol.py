@@ -28,6 +28,8 @@ class Loader[S: int, C: int, D: int](PreConnector[S, C, D]):
             [N:int](condition: Matrix[N, C], intermediate: Matrix[N, D]) -> Matrix[One, One]
         sample: Sample the data.
             [N:int](batch: N) -> Matrix[N, int]
+        sample_where: Sample the data among the rows holding given keys.
+            (keys: Matrix[M, K], k: int) -> Matrix[M * k, int]
         load: Encode the data.
             [N:int](data: Matrix[N, int]) -> Matrix[N, D]
         unload: Decode the data.
@@ -48,6 +50,31 @@ class Loader[S: int, C: int, D: int](PreConnector[S, C, D]):
         Returns:
             Matrix[N, S]: The encoded data.
 
+        '''
+        ...
+    def sample_where(self, keys: Matrix[int, int], k: int) -> Matrix[int, S]:
+        '''
+        Sample the data among the rows holding given keys.
+
+        Args:
+            keys (Matrix[M, K]): The values of the key columns, one row per key.
+            k (int): The number of rows drawn for every key.
+
+        Returns:
+            Matrix[M * k, S]: The encoded data, `k` consecutive rows per key.
+
+        '''
+        ...
+    def unload[N: int](self, data: Matrix[N, D]) -> Matrix[N, int]:
+        '''
+        Decode generated data back to the raw space.
+
+        Args:
+            data (Matrix[N, D]): The intercepted data.
+
+        Returns:
+            Matrix[N, int]: The raw data.
+
         '''
         ...
     def move(self, device: Device) -> Self:
@@ -1,6 +1,6 @@
 from typing import override
 
-from modugant.loaders.protocol import Sampler
+from modugant.loaders.samplers.protocol import Sampler
 from modugant.matrix.index import Index
 
 
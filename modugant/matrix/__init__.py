@@ -1,6 +1,7 @@
 '''Matrix package for matrix operations.'''
+from .batched import BatchedMatrix
 from .dim import Dim
 from .index import Index
 from .matrix import Matrix
 
-__all__ = ['Matrix', 'Dim', 'Index']
+__all__ = ['BatchedMatrix', 'Matrix', 'Dim', 'Index']
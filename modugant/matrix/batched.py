@@ -0,0 +1,34 @@
+from typing import Sequence, Tuple, cast
+
+from torch import Tensor, stack
+
+from .matrix import Matrix
+
+
+class BatchedMatrix[M: int, R: int, C: int](Tensor):
+    '''Stack of matrices along a leading model dimension.'''
+
+    @staticmethod
+    def cast[MS: int, RS: int, CS: int](data: Tensor, shape: Tuple[MS, RS, CS]) -> 'BatchedMatrix[MS, RS, CS]':
+        '''Insist that the data is a stack of matrices of the given shape.'''
+        return cast(BatchedMatrix[MS, RS, CS], data)
+    @staticmethod
+    def load[MS: int, RS: int, CS: int](data: Tensor, shape: Tuple[MS, RS, CS]) -> 'BatchedMatrix[MS, RS, CS]':
+        '''Load the data as a stack of matrices of the given shape.'''
+        assert data.shape == shape, f'Data of shape {tuple(data.shape)} is not of shape {shape}'
+        return BatchedMatrix.cast(data, shape)
+    @staticmethod
+    def stack[RS: int, CS: int](matrices: Sequence[Matrix[RS, CS]]) -> 'BatchedMatrix[int, RS, CS]':
+        '''Stack matrices of the same shape.'''
+        assert len(matrices) > 0, 'Cannot stack no matrices.'
+        (rows, cols) = (matrices[0].shape[0], matrices[0].shape[1])
+        return BatchedMatrix.cast(stack(tuple(matrices)), (len(matrices), rows, cols))
+    @staticmethod
+    def expand[MS: int, RS: int, CS: int](matrix: Matrix[RS, CS], models: MS) -> 'BatchedMatrix[MS, RS, CS]':
+        '''Share one matrix between every model without copying it.'''
+        (rows, cols) = (matrix.shape[0], matrix.shape[1])
+        return BatchedMatrix.cast(matrix.expand(models, -1, -1), (models, rows, cols))
+    @staticmethod
+    def member[MS: int, RS: int, CS: int](data: 'BatchedMatrix[MS, RS, CS]', model: int) -> Matrix[RS, CS]:
+        '''Select the matrix of one model.'''
+        return Matrix.cast(data[model], (data.shape[1], data.shape[2]))
@@ -1,4 +1,5 @@
-from typing import Any, Iterable, List, Self, Sequence, Tuple, TypeGuard, cast, overload, override
+from functools import lru_cache
+from typing import Any, Iterable, List, Literal, Self, Sequence, Tuple, TypeGuard, cast, overload, override
 
 from torch import ones, randperm
 
@@ -28,6 +29,9 @@ class Vector[D: int, T](Tuple[T, ...]):
         super().__init__()
         assert len(self) == dim, 'Data does not match size.'
         self._dim = dim
+    def __reduce__(self) -> Tuple[Any, ...]:
+        '''Rebuild the list from its items and size when pickled or copied.'''
+        return (type(self), (tuple(self), self._dim))
     @overload
     def __getitem__[N: int](self, key: 'Index[N, D]') -> 'Vector[N, T]':...
     @overload
@@ -63,9 +67,36 @@ class Vector[D: int, T](Tuple[T, ...]):
         '''The size of the list.'''
         return self._dim
 
+type Interned = Literal['slice', 'at', 'range', 'empty']
+
 class Index[D: int, C: int](Vector[D, int]):
     '''An index type.'''
 
+    @staticmethod
+    @lru_cache(maxsize = 4096)
+    def intern(kind: Interned, offset: int, size: int, cap: int) -> 'Index[Any, Any]':
+        '''
+        Create a shared index of a structured kind, validated only once per key.
+
+        Indices are immutable, so the same instance is returned for repeated keys.
+        Device placement happens when a tensor is indexed, so it is not part of the key.
+
+        Args:
+            kind (Interned): The kind of the index ('slice', 'at', 'range' or 'empty').
+            offset (int): The first position of the index.
+            size (int): The number of positions of the index.
+            cap (int): The capacity of the index.
+
+        Returns:
+            Index: The interned index.
+
+        '''
+        if kind == 'at':
+            return Index([offset], Dim.one(), cap)
+        elif kind == 'empty':
+            return Index([], Dim.zero(), cap)
+        else:
+            return Index(range(offset, offset + size), size, cap)
     @staticmethod
     def randperm[DS: int](dim: DS) -> 'Index[DS, DS]':
         '''Create a random permutation.'''
@@ -74,7 +105,7 @@ class Index[D: int, C: int](Vector[D, int]):
     @staticmethod
     def slice[DS: int, CS: int](offset: int, size: DS, cap: CS) -> 'Index[DS, CS]':
         '''Create a slice of the index.'''
-        return Index(range(offset, offset + size), size, cap)
+        return cast(Index[DS, CS], Index.intern('slice', offset, size, cap))
     @staticmethod
     def slices[DS: int, CS: int](slices: Sequence[Tuple[int, int]], size: DS, cap: CS) -> 'Index[DS, CS]':
         '''Create slices of the index.'''
@@ -92,33 +123,31 @@ class Index[D: int, C: int](Vector[D, int]):
     @staticmethod
     def range[DS: int](size: DS) -> 'Index[DS, DS]':
         '''Create a range of indices.'''
-        return Index(range(size), size, size)
+        return cast(Index[DS, DS], Index.intern('range', 0, size, size))
     @staticmethod
     def at[CS: int](index: int, cap: CS) -> 'Index[One, CS]':
         '''Create an index at a single position.'''
-        return Index([index], Dim.one(), cap)
+        return cast(Index[One, CS], Index.intern('at', index, 1, cap))
     @staticmethod
     def empty[CS: int](cap: CS) -> 'Index[Zero, CS]':
         '''Create an empty index.'''
-        return Index([], Dim.zero(), cap)
+        return cast(Index[Zero, CS], Index.intern('empty', 0, 0, cap))
     @staticmethod
     def sample[DS: int, CS: int](size: DS, cap: CS, replacement: bool = True) -> 'Index[DS, CS]':
         '''Create a random index.'''
         unif = ones((1, cap))
-        index = cast(List[int], unif.multinomial(size, replacement = replacement).squeeze().tolist())
+        index = cast(List[int], unif.multinomial(size, replacement = replacement).squeeze(0).tolist())
         return Index(index, size, cap)
     @staticmethod
     def partition[DS: int, CS: int](count: DS, cap: CS) -> Vector[DS, 'Index[int, CS]']:
         '''Partition an range of indices.'''
         assert cap >= count, 'Not enough indices to partition.'
         splits: List[int] = randperm(cap)[:(count - 1)].sort().values.tolist()
+        ## random boundaries are not interned, they would only churn the cache
+        bounds = [0, *splits, cap]
         indices = [
-            Index.slice(0, splits[0], cap),
-            *[
-                Index.slice(splits[i], splits[i + 1] - splits[i], cap)
-                for i in range(count - 2)
-            ],
-            Index.slice(splits[-1], cap - splits[-1], cap)
+            Index(range(bounds[i], bounds[i + 1]), bounds[i + 1] - bounds[i], cap)
+            for i in range(count)
         ]
         return Vector(indices, count)
     def __new__(cls, data: Iterable[int], dim: D, cap: C) -> Self:
@@ -129,6 +158,13 @@ class Index[D: int, C: int](Vector[D, int]):
         super().__init__(data, dim)
         assert all(0 <= i < cap for i in self), 'Index out of bounds.'
         self._cap = cap
+    @override
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return (type(self), (tuple(self), self._dim, self._cap))
+    @property
+    def identity(self) -> bool:
+        '''Whether the index selects every position of its capacity in order.'''
+        return self.dim == self.cap and all(i == j for (j, i) in enumerate(self))
     def wrap(self, cap: C) -> 'Index[D, C]':
         '''Wrap the index with a new capacity.'''
         return Index([i % cap for i in self], self.dim, cap)
@@ -73,7 +73,9 @@ def randint[R: int, C: int](low: int, high: int, shape: Tuple[R, C], **kwargs: A
 ## Functional operations
 def one_hot[N: int, C: int](matrix: Matrix[N, One], num_classes: C) -> Matrix[N, C]:
     '''Convert a matrix of one-hot vectors to a matrix of one-hot vectors with a different number of classes.'''
-    return Matrix.cast(t_one_hot(matrix, num_classes)[:, 0], (matrix.shape[0], num_classes))
+    ## the indices may be stored as floats, the encoding keeps their dtype so conditions stay floating point
+    encoded = t_one_hot(matrix.long(), num_classes)[:, 0].to(matrix.dtype)
+    return Matrix.cast(encoded, (matrix.shape[0], num_classes))
 
 @overload
 def cross_entropy[R: int, C: int](
@@ -0,0 +1,149 @@
+'''
+Serialization of a trained generation pipeline.
+
+Classes:
+    Pipeline: A generator and the fitted connector decoding its output.
+
+'''
+from functools import partial
+from importlib import import_module
+from operator import getitem
+from typing import Any, NamedTuple, Optional, Self
+
+from torch import Generator as TorchGenerator
+from torch import ScriptObject, inference_mode, load, save
+from torch.quasirandom import SobolEngine
+from torch.serialization import get_unsafe_globals_in_checkpoint, safe_globals
+
+from modugant.conditions.empirical import EmpiricalConditions
+from modugant.conditions.protocol import ConditionSource
+from modugant.device import Device, check_device
+from modugant.generation.program import program
+from modugant.generators.base import BasicGenerator
+from modugant.generators.frozen import FrozenGenerator
+from modugant.generators.protocol import Generator
+from modugant.loaders.connectors.protocol import Connector
+from modugant.matrix.matrix import Matrix
+
+_FORMAT = 1
+## besides modugant itself, a pipeline may only reference torch layers, activations and these callables
+_LAYERS = ('torch.nn.modules.', 'torch.nn.functional.', 'torch._C._nn.', 'torch.ao.nn.')
+_CALLABLES = {
+    'functools.partial': partial,
+    '_operator.getitem': getitem,
+    'torch._C.Generator': TorchGenerator,
+    'torch.quasirandom.SobolEngine': SobolEngine,
+    'torch.ScriptObject': ScriptObject
+}
+
+
+def _globals(path: str) -> list[Any]:
+    '''Resolve the classes and functions a saved pipeline references, rejecting any outside the allowed ones.'''
+    resolved: list[Any] = []
+    for name in get_unsafe_globals_in_checkpoint(path):
+        if name in _CALLABLES:
+            resolved.append(_CALLABLES[name])
+            continue
+        assert name.startswith(('modugant.', *_LAYERS)), f'The pipeline references {name}, which is not allowed.'
+        (module, _, attribute) = name.rpartition('.')
+        resolved.append(getattr(import_module(module), attribute))
+    return resolved
+
+
+class Pipeline[S: int, C: int, L: int, D: int](NamedTuple):
+    '''
+    A generator and the fitted connector decoding its output.
+
+    The connector carries every fitted statistic (means and deviations, encoders, random effect tables,
+    index maps) and the optional condition source replaces the loader, so a loaded pipeline does not
+    need the training data.
+    '''
+
+    generator: Generator[C, L, D]
+    connector: Connector[S, C, D]
+    conditions: Optional[ConditionSource[C]] = None
+    def save(self, path: str) -> None:
+        '''
+        Save the pipeline to a file whose tensors can be memory-mapped on load.
+
+        Args:
+            path (str): The file to write.
+
+        '''
+        save(
+            {
+                'format': _FORMAT,
+                'dims': self.dims,
+                'generator': self.generator,
+                'connector': self.connector,
+                'conditions': self.conditions
+            },
+            path
+        )
+    @classmethod
+    def load(cls, path: str, device: Device = 'cpu', mmap: bool = True) -> Self:
+        '''
+        Load a pipeline saved with `save`.
+
+        The file is unpickled weights-only, with only modugant classes, torch layers and activations
+        allowed, so a file cannot run arbitrary code. It still names the classes and attributes of the
+        pipeline, so a file saved before one of them is renamed cannot be loaded after.
+
+        Args:
+            path (str): The file to read.
+            device (Device): The device to place the generator on.
+            mmap (bool): Whether to memory-map the tensors instead of reading them, keeping cold starts short.
+
+        Returns:
+            Pipeline: The pipeline, with the generator in evaluation mode.
+
+        '''
+        ## the pipeline holds modules and connectors, not only tensors, so their classes are allowed explicitly
+        with safe_globals(_globals(path)):
+            checkpoint: dict[str, Any] = load(path, mmap = mmap, weights_only = True)
+        assert checkpoint['format'] == _FORMAT, f'Unsupported pipeline format {checkpoint["format"]}.'
+        generator: Generator[C, L, D] = checkpoint['generator'].move(check_device(device))
+        connector: Connector[S, C, D] = checkpoint['connector']
+        ## pipelines saved before condition sources were added have none
+        conditions: Optional[ConditionSource[C]] = checkpoint.get('conditions')
+        if conditions is not None:
+            conditions = conditions.move(check_device(device))
+        pipeline = cls(generator, connector, conditions)
+        assert pipeline.dims == checkpoint['dims'], 'The saved dimensions do not match the loaded pipeline.'
+        _ = generator.train(False)
+        return pipeline
+    def export(self, path: str, unload: bool = True) -> None:
+        '''
+        Export the sampling path as one TorchScript program, loadable with `torch.jit.load` alone.
+
+        Args:
+            path (str): The file to write.
+            unload (bool): Whether the program decodes the rows back to the raw space.
+
+        '''
+        assert isinstance(self.conditions, EmpiricalConditions), 'Exporting a pipeline needs empirical conditions.'
+        assert isinstance(self.generator, (BasicGenerator, FrozenGenerator)), (
+            'Only basic and frozen generators can be exported.'
+        )
+        program(self.generator, self.connector, self.conditions, unload).save(path)
+    @property
+    def dims(self) -> tuple[int, int, int, int]:
+        '''The sampled, condition, latent and output dimensions.'''
+        return (self.connector.samples, self.connector.conditions, self.generator.latents, self.connector.outputs)
+    def sample[N: int](self, n: N, unload: bool = False) -> Matrix[N, Any]:
+        '''
+        Sample the generator with conditions drawn from the condition source.
+
+        Args:
+            n (int): The number of samples.
+            unload (bool): Whether to decode the samples back to the raw space.
+
+        Returns:
+            Matrix: The samples.
+
+        '''
+        assert self.conditions is not None, 'Sampling a pipeline needs a condition source.'
+        with inference_mode():
+            condition = self.conditions.sample(n)
+            generated = self.connector.intercept(condition, self.generator.sample(condition))
+            return self.connector.unload(generated) if unload else generated
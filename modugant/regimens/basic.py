@@ -2,7 +2,7 @@
 import math
 from typing import Optional, Tuple, override
 
-from modugant.protocols import Action, Regimen
+from modugant.regimens.protocol import Action, Regimen
 
 
 class BasicRegimen(Regimen):
@@ -0,0 +1,288 @@
+'''
+Local inference server coalescing sampling requests into batched generator calls.
+
+Classes:
+    BatchingServer: Asyncio HTTP server sampling a loaded pipeline for (condition, count) requests.
+
+'''
+import json
+from asyncio import (
+    AbstractServer,
+    Event,
+    IncompleteReadError,
+    Queue,
+    StreamReader,
+    StreamWriter,
+    Task,
+    TimeoutError,
+    create_task,
+    get_running_loop,
+    start_server,
+    wait_for,
+)
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Optional
+
+from torch import Tensor, cat, float32, inference_mode, tensor
+
+from modugant.device import Device, check_device
+from modugant.matrix.matrix import Matrix
+from modugant.pipeline import Pipeline
+
+_LOCAL = ('127.0.0.1', 'localhost', '::1')
+## the chunks generated for a request but not yet sent, beyond which it is not scheduled
+_BACKLOG = 2
+_REASONS = {400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+
+class _Request:
+    '''A pending request: its condition, arrival time, rows not yet scheduled and queue of generated chunks.'''
+
+    def __init__(self, condition: Tensor, count: int, arrival: float) -> None:
+        self.condition = condition
+        self.arrival = arrival
+        self.pending = count
+        self.failed = False
+        self.chunks: Queue[Optional[Tensor]] = Queue()
+    @property
+    def ready(self) -> bool:
+        '''Whether the request has rows to schedule and its consumer keeps up.'''
+        return self.pending > 0 and self.chunks.qsize() < _BACKLOG
+
+
+class BatchingServer:
+    '''
+    Asyncio HTTP server sampling a loaded pipeline for (condition, count) requests.
+
+    Concurrent requests are queued and coalesced: the server waits for more requests until the oldest
+    queued one is `window` seconds old or a batch is full, then samples up to `batch` rows in one call
+    of the generator on a worker thread, splits the output by request and streams every part back as
+    soon as it is generated. Every batch is shared evenly between the queued requests, so a large
+    request is spread over several calls without holding back smaller ones. A request whose client
+    has not read its last chunks waits, and a request whose client disconnects is dropped.
+
+    `POST /sample` takes a JSON body `{"condition": [...], "count": n}` holding one encoded condition
+    vector, and answers with a chunked stream of little-endian float32 rows whose width is given by
+    the `X-Columns` header. The server only binds to the loopback interface.
+    '''
+
+    def __init__(
+        self,
+        pipeline: Pipeline[Any, Any, Any, Any],
+        batch: int = 65536,
+        window: float = 0.005,
+        limit: int = 1 << 24,
+        unload: bool = True,
+        host: str = '127.0.0.1',
+        port: int = 0,
+        device: Device = 'cpu'
+    ) -> None:
+        '''
+        Initialize the server.
+
+        Args:
+            pipeline (Pipeline): The loaded generator and connector.
+            batch (int): The largest number of rows sampled in one call.
+            window (float): The longest wait in seconds for more requests before sampling.
+            limit (int): The largest number of rows of one request.
+            unload (bool): Whether to decode the rows back to the raw space.
+            host (str): The loopback address to bind.
+            port (int): The port to bind, any free port if 0.
+            device (Device): The device of the generator.
+
+        '''
+        assert host in _LOCAL, 'The server only binds to the loopback interface.'
+        assert batch > 0 and window >= 0, 'The batch must be positive and the window non-negative.'
+        self._pipeline = pipeline
+        self._batch = batch
+        self._window = window
+        self._limit = limit
+        self._unload = unload
+        self._host = host
+        self._port = port
+        self._device = check_device(device)
+        self._queue: deque[_Request] = deque()
+        self._queued = 0
+        self._arrived = Event()
+        self._worker = ThreadPoolExecutor(1)
+        self._server: Optional[AbstractServer] = None
+        self._batcher: Optional[Task[None]] = None
+    def _generate(self, condition: Tensor) -> Tensor:
+        '''Sample and decode rows for a batch of conditions, on the worker thread.'''
+        with inference_mode():
+            condition = Matrix.cast(
+                condition.to(self._device),
+                (condition.shape[0], self._pipeline.connector.conditions)
+            )
+            generated = self._pipeline.connector.intercept(condition, self._pipeline.generator.sample(condition))
+            rows = self._pipeline.connector.unload(generated) if self._unload else generated
+            return rows.to(float32).cpu()
+    def _take(self) -> list[tuple[_Request, int]]:
+        '''Schedule up to a batch of rows, shared evenly between the ready requests.'''
+        (parts, room) = ({}, self._batch)
+        ready = [request for request in self._queue if request.ready]
+        while ready and room > 0:
+            share = max(1, room // len(ready))
+            for request in ready[:room]:
+                k = min(request.pending, share, room)
+                parts[request] = parts.get(request, 0) + k
+                request.pending -= k
+                room -= k
+            ready = [request for request in ready if request.pending > 0]
+        self._queued -= self._batch - room
+        ## served requests move to the back, so rounding never favours the same ones
+        self._queue = deque(
+            [request for request in self._queue if request not in parts]
+            + [request for request in parts if request.pending > 0]
+        )
+        return list(parts.items())
+    def _drop(self, request: _Request) -> None:
+        '''Remove the unscheduled rows of a request from the queue.'''
+        self._queued -= request.pending
+        request.pending = 0
+        if request in self._queue:
+            self._queue.remove(request)
+    async def _run(self) -> None:
+        '''Coalesce queued requests into batches until cancelled.'''
+        loop = get_running_loop()
+        while True:
+            while not any(request.ready for request in self._queue):
+                self._arrived.clear()
+                _ = await self._arrived.wait()
+            ## the window runs from the arrival of the oldest request, so no request waits longer than it
+            deadline = min(request.arrival for request in self._queue) + self._window
+            while self._queued < self._batch and (left := deadline - loop.time()) > 0:
+                self._arrived.clear()
+                try:
+                    _ = await wait_for(self._arrived.wait(), left)
+                except TimeoutError:
+                    break
+            parts = self._take()
+            if not parts:
+                continue
+            condition = cat([request.condition.expand(k, -1) for (request, k) in parts])
+            try:
+                rows = await loop.run_in_executor(self._worker, self._generate, condition)
+            except Exception:
+                ## a failed batch ends its requests instead of stopping the server
+                for (request, _) in parts:
+                    self._drop(request)
+                    request.failed = True
+                    request.chunks.put_nowait(None)
+                continue
+            for ((request, _), part) in zip(parts, rows.split([k for (_, k) in parts])):
+                request.chunks.put_nowait(part)
+                if request.pending == 0:
+                    request.chunks.put_nowait(None)
+    async def sample(self, condition: list[float], count: int) -> AsyncIterator[Tensor]:
+        '''
+        Queue a request and iterate over its rows as they are generated.
+
+        Closing the iterator early drops the rows of the request not generated yet.
+
+        Args:
+            condition (list[float]): The encoded condition vector.
+            count (int): The number of rows, at most the limit of the server.
+
+        Yields:
+            Tensor (K, D): The next rows of the request.
+
+        Raises:
+            RuntimeError: If sampling failed; the rows yielded so far are incomplete.
+
+        '''
+        assert len(condition) == self._pipeline.connector.conditions, 'The condition has the wrong width.'
+        assert 0 < count <= self._limit, 'The count must be positive and within the limit.'
+        request = _Request(tensor([condition], dtype = float32), count, get_running_loop().time())
+        self._queue.append(request)
+        self._queued += count
+        self._arrived.set()
+        try:
+            while (chunk := await request.chunks.get()) is not None:
+                ## reading a chunk may unblock the request, the batcher is woken to schedule it
+                self._arrived.set()
+                yield chunk
+            if request.failed:
+                raise RuntimeError('Sampling failed.')
+        finally:
+            self._drop(request)
+    async def _respond(self, writer: StreamWriter, status: int, message: str) -> None:
+        '''Answer a request with an error message.'''
+        body = message.encode()
+        writer.write(
+            f'HTTP/1.1 {status} {_REASONS[status]}\r\nContent-Type: text/plain\r\n'
+            f'Content-Length: {len(body)}\r\nConnection: close\r\n\r\n'.encode() + body
+        )
+        await writer.drain()
+    async def _handle(self, reader: StreamReader, writer: StreamWriter) -> None:
+        '''Serve one HTTP request.'''
+        try:
+            (method, target, _) = (await reader.readline()).decode().split(' ', 2)
+            headers: dict[str, str] = {}
+            while (line := (await reader.readline()).decode().strip()):
+                (name, value) = line.split(':', 1)
+                headers[name.strip().lower()] = value.strip()
+            body = json.loads(await reader.readexactly(int(headers.get('content-length', '0'))) or b'{}')
+            if target != '/sample':
+                return await self._respond(writer, 404, 'Unknown path.')
+            if method != 'POST':
+                return await self._respond(writer, 405, 'Use POST.')
+            (condition, count) = ([float(value) for value in body['condition']], int(body['count']))
+            if len(condition) != self._pipeline.connector.conditions or not 0 < count <= self._limit:
+                return await self._respond(
+                    writer,
+                    400,
+                    f'Expected a condition of the right width and a count in [1, {self._limit}].'
+                )
+        except (ValueError, KeyError, TypeError, IncompleteReadError):
+            return await self._respond(writer, 400, 'Malformed request.')
+        columns = None
+        try:
+            ## closing the rows on a dropped connection drops the rest of the request
+            async with aclosing(self.sample(condition, count)) as rows:
+                async for chunk in rows:
+                    if columns is None:
+                        columns = chunk.shape[1]
+                        writer.write(
+                            'HTTP/1.1 200 OK\r\nContent-Type: application/octet-stream\r\n'
+                            f'X-Columns: {columns}\r\nTransfer-Encoding: chunked\r\nConnection: close\r\n\r\n'.encode()
+                        )
+                    data = chunk.numpy().tobytes()
+                    writer.write(f'{len(data):x}\r\n'.encode() + data + b'\r\n')
+                    await writer.drain()
+        except RuntimeError:
+            if columns is None:
+                return await self._respond(writer, 500, 'Sampling failed.')
+            ## a started stream is cut without its final chunk, so the client sees it is incomplete
+            return writer.transport.abort()
+        writer.write(b'0\r\n\r\n')
+        await writer.drain()
+    async def _serve(self, reader: StreamReader, writer: StreamWriter) -> None:
+        '''Serve one connection and close it.'''
+        try:
+            await self._handle(reader, writer)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+    async def start(self) -> int:
+        '''
+        Start listening and batching.
+
+        Returns:
+            int: The bound port.
+
+        '''
+        self._server = await start_server(self._serve, self._host, self._port)
+        self._batcher = create_task(self._run())
+        return self._server.sockets[0].getsockname()[1]
+    async def close(self) -> None:
+        '''Stop listening and batching.'''
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._batcher is not None:
+            _ = self._batcher.cancel()
+        self._worker.shutdown(wait = False)
@@ -6,17 +6,33 @@ Classes:
 
 '''
 from contextlib import contextmanager
-from typing import Callable, Iterator, Optional, Tuple, cast
+from copy import deepcopy
+from threading import Lock
+from typing import Any, Callable, Iterator, Optional, Tuple, cast
 
-from torch import device
+from torch import Tensor, device, no_grad
 
+from modugant.conditions import ConditionSource, EmpiricalConditions
 from modugant.device import Device, check_device
 from modugant.discriminators import Discriminator
-from modugant.generators import Generator
-from modugant.loaders import Loader
+from modugant.generation import (
+    BulkSampler,
+    Fidelity,
+    Rejection,
+    RejectionSampler,
+    ShardedSampler,
+    Throughput,
+    Writer,
+    fidelity,
+    program,
+)
+from modugant.generation.sharded import WriterFactory
+from modugant.generators import BasicGenerator, FrozenGenerator, Generator
+from modugant.loaders import ComposedLoader, Loader
 from modugant.matrix import Dim
 from modugant.matrix.matrix import Matrix
 from modugant.matrix.ops import cat, ones, zeros
+from modugant.pipeline import Pipeline
 from modugant.regimens import Action, Regimen
 
 type Reporter = Callable[[int, Action, str, float, float], None]
@@ -26,6 +42,36 @@ def no_op(_: int, __: Action, ___: str, ____: float, _____: float) -> None:
     '''No operation.'''
     pass
 
+def _stack[N: int, M: int, K: int](top: Matrix[N, K], bottom: Matrix[M, K], buffer: Tensor) -> Matrix[int, K]:
+    '''Write two batches into the halves of a buffer, concatenating them instead if either needs gradients.'''
+    shape = (top.shape[0] + bottom.shape[0], top.shape[1])
+    if top.requires_grad or bottom.requires_grad:
+        return cat((top, bottom), dim = 0, shape = shape)
+    with no_grad():
+        _ = buffer[:top.shape[0]].copy_(top)
+        _ = buffer[top.shape[0]:].copy_(bottom)
+    return Matrix.cast(buffer, shape)
+
+def _detached[T](value: T) -> T:
+    '''Deep-copy an object graph, detaching the tensors computed from trainable ones.'''
+    ## non-leaf tensors cannot be deep-copied, their detached clones are placed in the memo instead
+    (memo, seen, stack) = (dict[int, Any](), set[int](), [cast(Any, value)])
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        if isinstance(item, Tensor):
+            if item.grad_fn is not None:
+                memo[id(item)] = item.detach().clone()
+        elif isinstance(item, dict):
+            stack.extend(cast(dict[Any, Any], item).values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(cast(list[Any], item))
+        elif hasattr(item, '__dict__'):
+            stack.extend(vars(item).values())
+    return deepcopy(value, memo)
+
 class Trainer[R: int, C: int, L: int, D: int]:
     '''
     Trainer for GANs.
@@ -59,13 +105,16 @@ class Trainer[R: int, C: int, L: int, D: int]:
         self.__generator = generator.move(self.__device)
         self.__discriminator = discriminator.move(self.__device)
         self.__loader = loader.move(self.__device)
+        ## held while the models change, so snapshots taken from other threads see whole steps
+        self.__lock = Lock()
     def restart(self) -> None:
         '''Restart the learning rate scheduler.'''
-        self.__loader.restart()
-        self.__discriminator.reset()
-        self.__discriminator.restart()
-        self.__generator.reset()
-        self.__generator.restart()
+        with self.__lock:
+            self.__loader.restart()
+            self.__discriminator.reset()
+            self.__discriminator.restart()
+            self.__generator.reset()
+            self.__generator.restart()
     def step[DN: int, GN: int](self, regimen: Regimen) -> Iterator[Tuple[int, Tuple[float, float]]]:
         '''
         Step the trainer.
@@ -90,34 +139,42 @@ class Trainer[R: int, C: int, L: int, D: int]:
             dim = 0,
             shape = (d_size, Dim.one())
         )
+        ## real and fake batches are written into the halves of persistent buffers
+        joined: Optional[Tuple[Tensor, Tensor]] = None
         i = 0
         with device(self.__device):
             while True:
-                d_error = 0
-                g_error = 0
-                for _ in range(regimen.k):
-                    r_sample = self.__loader.sample(regimen.batch)
-                    r_condition = self.__loader.condition(r_sample)
-                    r_data = self.__loader.prepare(r_sample)
-                    f_sample = self.__loader.sample(int(regimen.batch * regimen.d_factor))
+                with self.__lock:
+                    d_error = 0
+                    g_error = 0
+                    for _ in range(regimen.k):
+                        r_sample = self.__loader.sample(regimen.batch)
+                        r_condition = self.__loader.condition(r_sample)
+                        r_data = self.__loader.prepare(r_sample)
+                        f_sample = self.__loader.sample(int(regimen.batch * regimen.d_factor))
+                        f_condition = self.__loader.condition(f_sample)
+                        generated = self.__generator.sample(f_condition).detach()
+                        f_data = self.__loader.intercept(f_condition, generated)
+                        if joined is None:
+                            joined = (
+                                r_condition.new_empty((d_size, r_condition.shape[1])),
+                                r_data.new_empty((d_size, r_data.shape[1]))
+                            )
+                        loss = self.__discriminator.step(
+                            _stack(r_condition, f_condition, joined[0]),
+                            _stack(r_data, f_data, joined[1]),
+                            labels
+                        )
+                        d_error = loss.item()
+                    f_sample = self.__loader.sample(g_size)
                     f_condition = self.__loader.condition(f_sample)
-                    generated = self.__generator.sample(f_condition).detach()
+                    generated = self.__generator.sample(f_condition)
                     f_data = self.__loader.intercept(f_condition, generated)
-                    loss = self.__discriminator.step(
-                        cat((r_condition, f_condition), dim = 0, shape = (d_size, r_condition.shape[1])),
-                        cat((r_data, f_data), dim = 0, shape = (d_size, r_data.shape[1])),
-                        labels
-                    )
-                    d_error = loss.item()
-                f_sample = self.__loader.sample(g_size)
-                f_condition = self.__loader.condition(f_sample)
-                generated = self.__generator.sample(f_condition)
-                f_data = self.__loader.intercept(f_condition, generated)
-                d_loss = self.__discriminator.loss(f_condition, f_data, trues)
-                c_loss = self.__loader.loss(f_condition, generated)
-                self.__generator.update(d_loss + c_loss)
-                self.__loader.update()
-                g_error = d_loss.item()
+                    d_loss = self.__discriminator.loss(f_condition, f_data, trues)
+                    c_loss = self.__loader.loss(f_condition, generated)
+                    self.__generator.update(d_loss + c_loss)
+                    self.__loader.update()
+                    g_error = d_loss.item()
                 yield i, (d_error, g_error)
                 i += 1
     def train(self, regimen: Regimen, report: Optional[Reporter] = None) -> None:
@@ -150,19 +207,200 @@ class Trainer[R: int, C: int, L: int, D: int]:
             yield
             _ = self.__generator.train(True)
             _ = self.__discriminator.train(True)
-    def sample[N: int](self, n: N) -> Matrix[N, D]:
+    def generate(
+        self,
+        n: int,
+        chunk: int = 65536,
+        unload: bool = False,
+        writer: Optional[Writer] = None,
+        out: Optional[Tensor] = None
+    ) -> Throughput:
+        '''
+        Generate a large number of rows in chunks.
+
+        Args:
+            n (int): The number of rows.
+            chunk (int): The number of rows generated at once.
+            unload (bool): Whether to decode the rows back to the raw space.
+            writer (Optional[Writer]): The sink every chunk is written to.
+            out (Optional[Tensor (n, K)]): The storage the rows are copied into.
+
+        Returns:
+            Throughput: The number of rows, the seconds spent and the rows per second.
+
+        '''
+        with self.test():
+            return BulkSampler(self.__generator, self.__loader, chunk, unload).run(n, writer, out)
+    def generate_filtered(
+        self,
+        n: int,
+        chunk: int = 65536,
+        percentile: float = 0.95,
+        probabilities: Optional[bool] = None,
+        unload: bool = False,
+        writer: Optional[Writer] = None,
+        out: Optional[Tensor] = None
+    ) -> Rejection:
+        '''
+        Generate rows filtered by discriminator rejection sampling.
+
+        Args:
+            n (int): The number of accepted rows.
+            chunk (int): The number of rows generated and scored at once, also the burn-in size.
+            percentile (float): The quantile of the burn-in scores taken as the acceptance threshold.
+            probabilities (Optional[bool]): Whether the discriminator predicts probabilities rather than
+                logits; inferred from the type of the discriminator if None.
+            unload (bool): Whether to decode the rows back to the raw space.
+            writer (Optional[Writer]): The sink every chunk is written to.
+            out (Optional[Tensor (n, K)]): The storage the rows are copied into.
+
+        Returns:
+            Rejection: The rows accepted and drawn, the seconds spent, the accepted rows per second and
+                the acceptance rate.
+
+        '''
+        with self.test():
+            sampler = RejectionSampler(
+                self.__generator,
+                self.__discriminator,
+                self.__loader,
+                chunk,
+                percentile,
+                probabilities,
+                unload
+            )
+            return sampler.run(n, writer, out)
+    def generate_sharded(
+        self,
+        n: int,
+        seed: int,
+        workers: int,
+        shard: int = 1 << 20,
+        chunk: int = 65536,
+        unload: bool = False,
+        writers: Optional[WriterFactory] = None,
+        out: Optional[Tensor] = None
+    ) -> Throughput:
+        '''
+        Generate a large number of rows in reproducible shards across worker processes.
+
+        Args:
+            n (int): The number of rows.
+            seed (int): The global seed; the output depends only on it and the shard size.
+            workers (int): The number of worker processes; 0 generates in this process.
+            shard (int): The number of rows per shard.
+            chunk (int): The number of rows generated at once within a shard.
+            unload (bool): Whether to decode the rows back to the raw space.
+            writers (Optional[WriterFactory]): A picklable factory returning the writer of a shard.
+            out (Optional[Tensor (n, K)]): Host storage the rows are copied into.
+
+        Returns:
+            Throughput: The number of rows, the seconds spent and the rows per second.
+
+        '''
+        with self.test():
+            sampler = ShardedSampler(self.__generator, self.__loader, shard, chunk, unload)
+            return sampler.run(n, seed, workers, writers, out)
+    def fidelity(self, candidate: Generator[C, L, D], n: int = 65536, seed: int = 0) -> Fidelity:
+        '''
+        Compare the raw output of a candidate generator, such as a quantized one, against the generator.
+
+        Args:
+            candidate (Generator[C, L, D]): The candidate generator.
+            n (int): The number of rows compared.
+            seed (int): The seed of the random state shared by both generators.
+
+        Returns:
+            Fidelity: The largest gaps of the marginal and pairwise statistics.
+
+        '''
+        with self.test():
+            condition = self.__loader.condition(self.__loader.sample(n))
+            return fidelity(self.__generator, candidate, condition, self.__loader, seed)
+    def save(self, path: str, conditions: Optional[ConditionSource[C]] = None) -> None:
+        '''
+        Save the generator and the fitted connector, without the training data.
+
+        Args:
+            path (str): The file to write, loadable with `Pipeline.load`.
+            conditions (Optional[ConditionSource[C]]): The condition source saved along, to sample the loaded pipeline.
+
+        '''
+        assert isinstance(self.__loader, ComposedLoader), 'Only a composed loader exposes its connector.'
+        Pipeline(self.__generator, self.__loader.connector, conditions).save(path)
+    def export(self, path: str, conditions: Optional[EmpiricalConditions[C]] = None, unload: bool = True) -> None:
+        '''
+        Export the sampling path as one TorchScript program, loadable with `torch.jit.load` alone.
+
+        Args:
+            path (str): The file to write.
+            conditions (Optional[EmpiricalConditions[C]]): The distribution of conditions, fitted through
+                the loader if not given.
+            unload (bool): Whether the program decodes the rows back to the raw space.
+
+        '''
+        generator = self.__generator
+        assert isinstance(generator, (BasicGenerator, FrozenGenerator)), (
+            'Only basic and frozen generators can be exported.'
+        )
+        with self.test():
+            if conditions is None:
+                conditions = EmpiricalConditions.fit(self.__loader)
+            program(generator, self.__loader, conditions, unload).save(path)
+    def snapshot(self, conditions: Optional[ConditionSource[C]] = None) -> Pipeline[R, C, L, D]:
+        '''
+        Take an immutable evaluation copy of the generator and the connector.
+
+        The generator is frozen into a folded copy holding the weights and running statistics of the
+        last whole step, and the connector is deep-copied with its trainable transformers, such as
+        random effect tables. The live models keep their mode, so the snapshot can be taken and
+        sampled from another thread while `step` runs.
+
+        Args:
+            conditions (Optional[ConditionSource[C]]): The condition source attached to the snapshot.
+
+        Returns:
+            Pipeline: The frozen generator and the connector.
+
+        '''
+        generator = self.__generator
+        assert isinstance(generator, BasicGenerator), 'Only a basic generator can be frozen.'
+        assert isinstance(self.__loader, ComposedLoader), 'Only a composed loader exposes its connector.'
+        with self.__lock:
+            (frozen, connector) = (generator.freeze(), _detached(self.__loader.connector))
+        return Pipeline(frozen, connector, conditions)
+    def sample[N: int](self, n: N, conditions: Optional[ConditionSource[C]] = None) -> Matrix[N, D]:
         '''
         Sample the generator.
 
         Args:
             n (int): The number of samples.
+            conditions (Optional[ConditionSource[C]]): The source of conditions, drawn through the loader if not given.
 
         Returns:
             Matrix: The samples.
 
         '''
         with self.test():
-            sample = self.__loader.sample(n)
-            condition = self.__loader.condition(sample)
+            if conditions is None:
+                condition = self.__loader.condition(self.__loader.sample(n))
+            else:
+                condition = conditions.sample(n)
+            generated = self.__generator.sample(condition).detach()
+            return self.__loader.intercept(condition, generated)
+    def sample_where(self, keys: Matrix[int, int], k: int) -> Matrix[int, D]:
+        '''
+        Sample the generator conditioned on rows holding given keys.
+
+        Args:
+            keys (Matrix[M, K]): The values of the key columns indexed by the loader, one row per key.
+            k (int): The number of samples for every key.
+
+        Returns:
+            Matrix[M * k, D]: The samples, `k` consecutive rows per key.
+
+        '''
+        with self.test():
+            condition = self.__loader.condition(self.__loader.sample_where(keys, k))
             generated = self.__generator.sample(condition).detach()
             return self.__loader.intercept(condition, generated)
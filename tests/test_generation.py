@@ -0,0 +1,146 @@
+'''Tests of bulk, sharded and filtered generation, pipelines and frozen generators.'''
+from os import listdir
+
+import pytest
+from torch import Tensor, allclose, cat, empty, equal, manual_seed, no_grad, randint, randn, save
+
+from modugant.conditions import EmpiricalConditions
+from modugant.discriminators import FoldedDiscriminator
+from modugant.generation import NpyWriter, compact
+from modugant.generators import ResidualGenerator, SequentialGenerator
+from modugant.generators.base import BasicGenerator
+from modugant.latents import NormalSource
+from modugant.loaders import ComposedLoader
+from modugant.loaders.connectors.categorical import CategoricalConnector
+from modugant.loaders.connectors.joint import JointConnector
+from modugant.loaders.connectors.standardize import StandardizeConnector
+from modugant.loaders.samplers.uniform import RandomSampler
+from modugant.matrix import Index
+from modugant.pipeline import Pipeline
+from modugant.trainer import Trainer
+
+_ROWS = 1000
+
+type Sampled = ComposedLoader[int, int, int]
+type Joint = JointConnector[int, int, int]
+
+
+@pytest.fixture
+def data() -> Tensor:
+    '''Draw one categorical column of 3 levels and 4 numeric columns.'''
+    _ = manual_seed(0)
+    return cat([randint(0, 3, (_ROWS, 1)).float(), randn(_ROWS, 4)], dim = 1)
+
+
+@pytest.fixture
+def connector(data: Tensor) -> Joint:
+    '''Build the connector conditioning on the category and standardizing the numeric columns.'''
+    return JointConnector(
+        7,
+        3,
+        7,
+        [
+            CategoricalConnector(3, [(0, 3)]),
+            StandardizeConnector(data, Index([1, 2, 3, 4], 4, 5))
+        ]
+    )
+
+
+@pytest.fixture
+def loader(data: Tensor, connector: Joint) -> Sampled:
+    '''Build the loader sampling the data uniformly.'''
+    return ComposedLoader(data, RandomSampler(_ROWS), connector)
+
+
+def _trainer(loader: Sampled, generator: BasicGenerator[int, int, int]) -> Trainer[int, int, int, int]:
+    '''Build a trainer around a generator and a small discriminator.'''
+    return Trainer(generator, FoldedDiscriminator(3, 7, 1, [16]), loader)
+
+
+def test_sample_after_generate(loader: Sampled) -> None:
+    '''Bulk generation leaves a sourced generator usable for training.'''
+    generator = SequentialGenerator(3, 8, 7, [16], source = NormalSource(3, 8))
+    trainer = _trainer(loader, generator)
+    _ = trainer.generate(300, chunk = 128, out = empty(300, 7))
+    condition = loader.condition(loader.sample(64))
+    generated = generator.train(True).sample(condition)
+    _ = generated.square().sum().backward()
+    assert all(parameter.grad is not None for parameter in generator.parameters())
+    assert trainer.sample(64).isfinite().all()
+
+
+def test_generate(loader: Sampled, tmp_path: str) -> None:
+    '''Bulk generation fills preallocated storage and writes one file per chunk.'''
+    trainer = _trainer(loader, ResidualGenerator(3, 8, 7, [16]))
+    out = empty(1000, 5)
+    throughput = trainer.generate(1000, chunk = 256, unload = True, out = out)
+    assert throughput.rows == 1000
+    assert out.isfinite().all()
+    names = ['category', 'a', 'b', 'c', 'd']
+    writer = NpyWriter(str(tmp_path), names, compact(5, {0: 3}))
+    _ = trainer.generate(1000, chunk = 256, unload = True, writer = writer)
+    assert len(listdir(tmp_path)) == 4
+
+
+def test_generate_sharded(loader: Sampled) -> None:
+    '''Sharded generation does not depend on the number of workers.'''
+    trainer = _trainer(loader, ResidualGenerator(3, 8, 7, [16]))
+    outs = [empty(1000, 7), empty(1000, 7)]
+    for (workers, out) in zip((0, 2), outs):
+        throughput = trainer.generate_sharded(1000, seed = 1, workers = workers, shard = 300, chunk = 128, out = out)
+        assert throughput.rows == 1000
+    assert equal(outs[0], outs[1])
+    other = empty(1000, 7)
+    _ = trainer.generate_sharded(1000, seed = 2, workers = 0, shard = 300, chunk = 128, out = other)
+    assert not equal(outs[0], other)
+
+
+def test_generate_filtered(loader: Sampled) -> None:
+    '''Rejection sampling returns the rows asked for and keeps fewer of them at a higher percentile.'''
+    trainer = _trainer(loader, ResidualGenerator(3, 8, 7, [16]))
+    rates: list[float] = []
+    for percentile in (0.0, 0.9):
+        _ = manual_seed(0)
+        out = empty(2000, 7)
+        rejection = trainer.generate_filtered(2000, chunk = 1024, percentile = percentile, out = out)
+        assert rejection.rows == 2000 and rejection.drawn >= 2000
+        assert out.isfinite().all()
+        rates.append(rejection.acceptance)
+    assert 0 < rates[1] < rates[0] <= 1
+
+
+def test_pipeline(loader: Sampled, connector: Joint, tmp_path: str) -> None:
+    '''A saved pipeline loads with the same dimensions and samples as the original.'''
+    generator = ResidualGenerator(3, 8, 7, [16]).train(False)
+    pipeline = Pipeline(generator, connector, EmpiricalConditions.fit(loader, 4096))
+    path = f'{tmp_path}/pipeline.pt'
+    pipeline.save(path)
+    loaded = Pipeline.load(path)
+    assert loaded.dims == pipeline.dims
+    samples: list[Tensor] = []
+    for source in (pipeline, loaded):
+        _ = manual_seed(0)
+        samples.append(source.sample(100, unload = True))
+    assert allclose(samples[0], samples[1])
+
+
+def test_pipeline_rejects_unknown_globals(tmp_path: str) -> None:
+    '''A file referencing anything outside modugant and torch layers is not unpickled.'''
+    path = f'{tmp_path}/pipeline.pt'
+    save({'format': 1, 'reference': listdir}, path)
+    with pytest.raises(AssertionError):
+        _ = Pipeline.load(path)
+
+
+@pytest.mark.parametrize('dense', [False, True])
+def test_freeze(loader: Sampled, dense: bool) -> None:
+    '''A frozen generator matches the generator in evaluation mode.'''
+    generator = ResidualGenerator(3, 8, 7, [16, 16], dense = dense)
+    condition = loader.condition(loader.sample(256))
+    latent = generator.latent(condition)
+    ## a few passes in training mode move the running statistics folded into the frozen model
+    with no_grad():
+        for _ in range(3):
+            _ = generator.train(True).generate(condition, randn(256, 8))
+    expected = generator.train(False).generate(condition, latent)
+    assert allclose(generator.freeze().generate(condition, latent), expected, atol = 1e-5)